@@ -10,11 +10,15 @@ Usage:
         --video data/raw/training_video.mp4 \
         --text "Hello, this is a test." \
         --output outputs/videos/baseline.mp4
+
+Long audio (over AudioConfig.stream_min_duration) is processed in windows of
+--chunk-seconds so memory stays flat; pass --chunk-seconds 0 to force a single pass.
 """
 
 import argparse
 import sys
 from pathlib import Path
+from typing import Optional
 import subprocess
 import tempfile
 
@@ -22,7 +26,9 @@ import tempfile
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.config import OUTPUT_DIR, EXTERNAL_DIR, VIDEOS_DIR
+from src.config import OUTPUT_DIR, EXTERNAL_DIR, VIDEOS_DIR, AUDIO_CONFIG
+from src.lipsync.wav2lip import get_runner
+from src.streaming.ingest import process_in_windows, should_stream
 
 
 def generate_audio_from_text(text: str, output_path: Path, voice: str = "en-US-AriaNeural"):
@@ -54,49 +60,70 @@ def generate_audio_from_text(text: str, output_path: Path, voice: str = "en-US-A
         return False
 
 
-def run_wav2lip(video_path: Path, audio_path: Path, output_path: Path):
-    """Run Wav2Lip inference"""
+class Wav2LipError(RuntimeError):
+    """Wav2Lip could not render the video; carries the reason"""
+
+
+def run_wav2lip(
+    video_path: Path,
+    audio_path: Path,
+    output_path: Path,
+    start_time: float = 0.0,
+    duration: Optional[float] = None,
+):
+    """
+    Run Wav2Lip inference with the in-process runner.
+
+    The model stays loaded between calls and face boxes come from the disk
+    cache. ``start_time``/``duration`` select one window of a longer track,
+    for which only that window's avatar frames are decoded. Mouth crops are
+    composited with blend_crops.
+
+    Raises Wav2LipError with the reason (e.g. no face detected) on failure.
+    """
 
     wav2lip_dir = EXTERNAL_DIR / "Wav2Lip"
 
     if not wav2lip_dir.exists():
-        print(f"❌ Wav2Lip not found at {wav2lip_dir}")
-        print("Run setup_runpod.sh first!")
-        return False
+        raise Wav2LipError(f"Wav2Lip not found at {wav2lip_dir}. Run setup_runpod.sh first!")
 
     # Download Wav2Lip checkpoint if not exists
     checkpoint_path = wav2lip_dir / "checkpoints" / "wav2lip_gan.pth"
     if not checkpoint_path.exists():
         print("📥 Downloading Wav2Lip checkpoint...")
         checkpoint_path.parent.mkdir(exist_ok=True)
-        subprocess.run([
+        result = subprocess.run([
             "wget",
             "https://iiitaphyd-my.sharepoint.com/personal/radrabha_m_research_iiit_ac_in/_layouts/15/download.aspx?share=EdjI7bZlgApMqsVoEUUXpLsBxqXbn5z8VTmoxp55YNDcIA",
             "-O", str(checkpoint_path)
-        ], check=True)
+        ], capture_output=True, text=True)
+        if result.returncode != 0:
+            checkpoint_path.unlink(missing_ok=True)
+            raise Wav2LipError(f"Checkpoint download failed: {result.stderr.strip()}")
 
     print(f"🎬 Running Wav2Lip...")
     print(f"   Video: {video_path}")
     print(f"   Audio: {audio_path}")
 
     try:
-        cmd = [
-            "python", str(wav2lip_dir / "inference.py"),
-            "--checkpoint_path", str(checkpoint_path),
-            "--face", str(video_path),
-            "--audio", str(audio_path),
-            "--outfile", str(output_path),
-            "--pads", "0", "10", "0", "0",  # Top, bottom, left, right padding
-            "--resize_factor", "1",
-        ]
-
-        subprocess.run(cmd, check=True, cwd=wav2lip_dir)
+        runner = get_runner(checkpoint_path)  # Pads default to 0 10 0 0 (top, bottom, left, right)
+        if duration is None:
+            avatar = runner.load_avatar(video_path)
+            start_frame = round(start_time * avatar.fps)
+            preds = runner.infer(avatar, audio_path, start_frame)
+        else:
+            # The window avatar already starts at start_time and holds one frame per output frame
+            avatar = runner.load_avatar(video_path, start_time, duration)
+            start_frame = 0
+            preds = runner.infer(avatar, audio_path, num_frames=len(avatar.frames))
+        runner.encode(avatar, preds, audio_path, output_path, start_frame)
         print(f"✅ Video generated: {output_path}")
         return True
 
     except subprocess.CalledProcessError as e:
-        print(f"❌ Wav2Lip failed: {e}")
-        return False
+        raise Wav2LipError(e.stderr or str(e)) from e
+    except ValueError as e:
+        raise Wav2LipError(str(e)) from e
 
 
 def main():
@@ -107,6 +134,9 @@ def main():
     parser.add_argument("--voice", type=str, default="en-US-AriaNeural",
                         help="Voice for edge-tts (default: en-US-AriaNeural)")
     parser.add_argument("--output", type=Path, required=True, help="Output video file")
+    parser.add_argument("--chunk-seconds", type=float, default=None,
+                        help="Process audio in windows of this length "
+                             f"(default: {AUDIO_CONFIG.stream_window_seconds}s for long inputs, 0 disables)")
 
     args = parser.parse_args()
 
@@ -142,8 +172,24 @@ def main():
             print(f"❌ Audio not found: {audio_path}")
             return 1
 
-    # Run Wav2Lip
-    success = run_wav2lip(args.video, audio_path, args.output)
+    # Run Wav2Lip, window by window for long inputs
+    if args.chunk_seconds is None:
+        chunk_seconds = AUDIO_CONFIG.stream_window_seconds if should_stream(audio_path) else 0
+    else:
+        chunk_seconds = args.chunk_seconds
+
+    try:
+        if chunk_seconds > 0:
+            print(f"🪟 Streaming audio in {chunk_seconds:.1f}s windows")
+            # Windows decode their own avatar frames against the cached face boxes instead of cut slices
+            success = process_in_windows(
+                args.video, audio_path, args.output, run_wav2lip, chunk_seconds, cut_video=False
+            )
+        else:
+            success = run_wav2lip(args.video, audio_path, args.output)
+    except Wav2LipError as e:
+        print(f"❌ Wav2Lip failed: {e}")
+        success = False
 
     # Cleanup temp audio if generated
     if args.text and audio_path.exists():
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Batch Wav2Lip rendering - many scripts against one avatar
+
+Reads a JSONL or CSV manifest of jobs and renders each against the same
+avatar video. The Wav2Lip model and the avatar's face boxes are loaded once
+and shared by every job. TTS and encoding run on worker pools around a
+single inference thread, so the GPU is kept busy while the next script is
+synthesised and the previous video is written.
+
+Manifest fields (one job per line / row):
+    id      unique job id (default: line number)
+    text    text to synthesise, or
+    audio   path to an existing audio file
+    voice   edge-tts voice (optional)
+    output  output video path (optional, default: <output-dir>/<id>.mp4)
+
+Completed jobs are appended to the results manifest as they finish, so a
+crashed run can be restarted with the same command and will skip them.
+
+Usage:
+    python scripts/batch_wav2lip.py \
+        --video data/raw/training_video.mp4 \
+        --manifest scripts.jsonl \
+        --output-dir outputs/videos/batch
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import AUDIO_CONFIG, VIDEOS_DIR
+from src.lipsync.wav2lip import Wav2LipRunner
+from baseline_wav2lip import generate_audio_from_text
+
+
+def load_manifest(path: Path, output_dir: Path):
+    """Parse a JSONL or CSV manifest into a list of job dicts"""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            rows = [dict(row) for row in csv.DictReader(f)]
+    else:
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    seen = set()
+    for i, row in enumerate(rows, start=1):
+        job_id = str(row.get("id") or i)
+        if job_id in seen:
+            raise ValueError(f"Duplicate job id in manifest: {job_id}")
+        seen.add(job_id)
+        if not row.get("text") and not row.get("audio"):
+            raise ValueError(f"Job {job_id} needs either 'text' or 'audio'")
+        jobs.append({
+            "id": job_id,
+            "text": row.get("text") or None,
+            "audio": Path(row["audio"]) if row.get("audio") else None,
+            "voice": row.get("voice") or AUDIO_CONFIG.tts_voice,
+            "output": Path(row["output"]) if row.get("output") else output_dir / f"{job_id}.mp4",
+        })
+    return jobs
+
+
+def load_completed(results_path: Path):
+    """Job ids already rendered successfully by a previous run"""
+    done = set()
+    if not results_path.exists():
+        return done
+    with open(results_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial line from a crash mid-write
+                continue
+            if record.get("status") == "ok" and Path(record["output"]).exists():
+                done.add(record["id"])
+    return done
+
+
+def repair_results(results_path: Path):
+    """
+    Make sure the results manifest ends with a newline before appending.
+
+    A crash mid-write can leave a torn last line; appending straight onto it
+    would corrupt the next record too. A torn line that is not valid JSON is
+    truncated (load_completed already ignored it), while a complete record
+    that only lost its newline is terminated.
+    """
+    if not results_path.exists():
+        return
+    with open(results_path, "rb+") as f:
+        data = f.read()
+        if not data or data.endswith(b"\n"):
+            return
+        cut = data.rfind(b"\n") + 1
+        try:
+            json.loads(data[cut:])
+        except ValueError:
+            f.truncate(cut)
+        else:
+            f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_result(results_path: Path, record: dict):
+    """Append one result line and flush it to disk before moving on"""
+    with open(results_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def prepare_audio(job: dict, tmp_dir: Path):
+    """TTS stage: returns (audio_path, seconds spent)"""
+    start = time.perf_counter()
+    if job["audio"]:
+        if not job["audio"].exists():
+            raise FileNotFoundError(f"Audio not found: {job['audio']}")
+        return job["audio"], 0.0
+
+    audio_path = tmp_dir / f"{job['id']}.wav"
+    if not generate_audio_from_text(job["text"], audio_path, job["voice"]):
+        raise RuntimeError("TTS failed")
+    return audio_path, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Wav2Lip rendering from a manifest")
+    parser.add_argument("--video", type=Path, required=True, help="Avatar video shared by all jobs")
+    parser.add_argument("--manifest", type=Path, required=True, help="JSONL or CSV job manifest")
+    parser.add_argument("--output-dir", type=Path, default=VIDEOS_DIR / "batch", help="Default output directory")
+    parser.add_argument("--results", type=Path, help="Results manifest (default: <output-dir>/results.jsonl)")
+    parser.add_argument("--checkpoint", type=Path, help="Wav2Lip checkpoint (default: wav2lip_gan.pth)")
+    parser.add_argument("--tts-workers", type=int, default=4, help="Concurrent TTS requests")
+    parser.add_argument("--encode-workers", type=int, default=2, help="Concurrent compositing/encoding jobs")
+    parser.add_argument("--batch-size", type=int, default=128, help="Wav2Lip inference batch size")
+    args = parser.parse_args()
+
+    if not args.video.exists():
+        print(f"❌ Video not found: {args.video}")
+        return 1
+    if not args.manifest.exists():
+        print(f"❌ Manifest not found: {args.manifest}")
+        return 1
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    results_path = args.results or args.output_dir / "results.jsonl"
+
+    jobs = load_manifest(args.manifest, args.output_dir)
+    completed = load_completed(results_path)
+    repair_results(results_path)
+    pending = [job for job in jobs if job["id"] not in completed]
+    print(f"📋 {len(jobs)} jobs in manifest, {len(completed)} already done, {len(pending)} to render")
+    if not pending:
+        return 0
+
+    run_start = time.perf_counter()
+    print("🧠 Loading Wav2Lip model and avatar...")
+    runner = Wav2LipRunner(args.checkpoint, batch_size=args.batch_size)
+    avatar = runner.load_avatar(args.video)
+    setup_s = time.perf_counter() - run_start
+    print(f"✅ Ready in {setup_s:.1f}s ({len(avatar.frames)} avatar frames @ {avatar.fps:.1f} fps)")
+
+    stats = {"ok": 0, "failed": 0, "frames": 0, "audio_seconds": 0.0}
+
+    def encode_job(job, audio_path, preds, timings):
+        start = time.perf_counter()
+        runner.encode(avatar, preds, audio_path, job["output"])
+        timings["encode_s"] = time.perf_counter() - start
+        return timings
+
+    def finish(job, timings=None, error=None):
+        record = {"id": job["id"], "output": str(job["output"])}
+        if error is None:
+            record.update(status="ok", **timings)
+            stats["ok"] += 1
+            stats["frames"] += timings["frames"]
+            stats["audio_seconds"] += timings["audio_seconds"]
+            print(f"✅ [{job['id']}] {timings['frames']} frames -> {job['output']}")
+        else:
+            record.update(status="failed", error=str(error))
+            stats["failed"] += 1
+            print(f"❌ [{job['id']}] {error}")
+        append_result(results_path, record)
+
+    with tempfile.TemporaryDirectory(prefix="batch_tts_") as tmp, \
+            ThreadPoolExecutor(args.tts_workers) as tts_pool, \
+            ThreadPoolExecutor(args.encode_workers) as encode_pool:
+        tmp_dir = Path(tmp)
+        tts_futures = [tts_pool.submit(prepare_audio, job, tmp_dir) for job in pending]
+        encodes = []
+
+        # Inference stays on this thread so the model is never used concurrently
+        for job, tts_future in zip(pending, tts_futures):
+            try:
+                audio_path, tts_s = tts_future.result()
+                start = time.perf_counter()
+                preds = runner.infer(avatar, audio_path)
+                timings = {
+                    "tts_s": round(tts_s, 3),
+                    "infer_s": round(time.perf_counter() - start, 3),
+                    "frames": len(preds),
+                    "audio_seconds": round(len(preds) / avatar.fps, 3),
+                }
+            except Exception as e:
+                finish(job, error=e)
+                continue
+
+            # Bound memory held by predictions waiting to be encoded
+            while len(encodes) >= args.encode_workers * 2:
+                done_job, done_future = encodes.pop(0)
+                try:
+                    finish(done_job, done_future.result())
+                except Exception as e:
+                    finish(done_job, error=e)
+
+            encodes.append((job, encode_pool.submit(encode_job, job, audio_path, preds, timings)))
+
+        for job, future in encodes:
+            try:
+                finish(job, future.result())
+            except Exception as e:
+                finish(job, error=e)
+
+    wall_s = time.perf_counter() - run_start
+    summary = {
+        "jobs_ok": stats["ok"],
+        "jobs_failed": stats["failed"],
+        "wall_s": round(wall_s, 2),
+        "setup_s": round(setup_s, 2),
+        "jobs_per_min": round(stats["ok"] / wall_s * 60, 2),
+        "frames_per_s": round(stats["frames"] / wall_s, 2),
+        "realtime_factor": round(stats["audio_seconds"] / wall_s, 3),
+    }
+    results_path.with_name(results_path.stem + "_summary.json").write_text(json.dumps(summary, indent=2))
+
+    print("\n" + "="*60)
+    print("📊 BATCH SUMMARY")
+    print("="*60)
+    for key, value in summary.items():
+        print(f"{key:>16}: {value}")
+
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
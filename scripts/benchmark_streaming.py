@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Memory vs. duration benchmark for windowed rendering
+
+Synthesises speech-length WAV files of increasing duration and runs the full
+process_in_windows pipeline on each: audio decoding, per-window avatar
+decoding and rendering, segment encoding, concatenation, the cross-fade
+rewrite and the final mux. Every run happens in a fresh child process, and
+its peak resident set size (RSS) is reported against the input duration; with
+bounded-memory streaming the peak should stay flat as duration grows.
+
+The default ``stub`` renderer needs no model: it decodes the window's avatar
+frames like Wav2LipRunner does and paints a mouth box driven by the audio
+level. ``--renderer wav2lip`` runs the real in-process Wav2Lip path instead
+(needs the checkpoint and a --video with a face).
+
+Usage:
+    python scripts/benchmark_streaming.py --durations 60 300 900 1800
+    python scripts/benchmark_streaming.py --renderer wav2lip --video data/raw/training_video.mp4
+"""
+
+import argparse
+import json
+import math
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import RENDERING_CONFIG
+
+
+def synth_wav(path: Path, duration: float, sample_rate: int = 44100, channels: int = 2):
+    """Write a syllable-like modulated tone without holding it all in memory"""
+    block = sample_rate  # one second per write
+    t = np.arange(block) / sample_rate
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)  # ~4 syllables per second
+    tone = (0.3 * envelope * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+    frames = np.repeat(tone[:, None], channels, axis=1).tobytes()
+
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for _ in range(int(math.ceil(duration))):
+            wav.writeframes(frames)
+
+
+def synth_avatar(path: Path, seconds: float = 5.0, size: int = 256):
+    """Short looping avatar clip with some motion, so frames differ"""
+    import cv2
+
+    fps = RENDERING_CONFIG.fps
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (size, size))
+    yy, xx = np.mgrid[0:size, 0:size]
+    for i in range(int(seconds * fps)):
+        frame = np.stack([(xx + 2 * i) % 256, (yy + i) % 256, np.full_like(xx, 128)], axis=-1)
+        writer.write(frame.astype(np.uint8))
+    writer.release()
+
+
+def stub_render_window(video_path: Path, audio_path: Path, output_path: Path,
+                       start_time: float = 0.0, duration: float = 0.0) -> bool:
+    """
+    Model-free WindowRenderer with Wav2LipRunner's memory profile.
+
+    Decodes only the frames of this window (looping the avatar), paints a
+    mouth box scaled by each frame's audio level and encodes the segment.
+    """
+    import cv2
+    from src.streaming.ingest import iter_video_frames
+
+    with wave.open(str(audio_path), "rb") as wav:
+        rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or RENDERING_CONFIG.fps
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    cap.release()
+
+    count = math.ceil(round(duration * fps, 6))
+    skip = round(start_time * fps) % total
+    per_frame = rate / fps
+
+    writer = None
+    written = 0
+    for batch in iter_video_frames(video_path, 32, loop=True):
+        if skip >= len(batch):
+            skip -= len(batch)
+            continue
+        for frame in batch[skip:]:
+            if written == count:
+                break
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+            level = samples[int(written * per_frame):int((written + 1) * per_frame)]
+            rms = float(np.sqrt(np.mean(level ** 2))) if len(level) else 0.0
+            opening = int(min(1.0, rms * 8) * (h // 8))
+            frame = frame.copy()
+            cv2.rectangle(frame, (w * 3 // 8, h * 5 // 8), (w * 5 // 8, h * 5 // 8 + opening), (40, 40, 160), -1)
+            writer.write(frame)
+            written += 1
+        skip = 0
+        if written == count:
+            break
+    if writer is not None:
+        writer.release()
+    return written == count
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """Peak resident set size so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+
+def worker(duration: float, renderer: str, video: Path, window_seconds: float):
+    """Run one pipeline in this process and print its stats as JSON"""
+    from src.postprocess.blending import count_frames
+    from src.streaming.ingest import process_in_windows
+
+    if renderer == "wav2lip":
+        from baseline_wav2lip import run_wav2lip as render_window
+    else:
+        render_window = stub_render_window
+
+    with tempfile.TemporaryDirectory(prefix="bench_stream_") as tmp:
+        audio = Path(tmp) / "speech.wav"
+        output = Path(tmp) / "out.mp4"
+        synth_wav(audio, duration)
+
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        ok = process_in_windows(video, audio, output, render_window, window_seconds, cut_video=False)
+        elapsed = time.perf_counter() - start
+
+        print(json.dumps({
+            "ok": bool(ok),
+            "baseline_mb": round(baseline, 1),
+            "peak_mb": round(peak_rss_mb(), 1),
+            "ffmpeg_peak_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            "seconds": round(elapsed, 2),
+            "frames": count_frames(output) if ok else 0,
+            "expected_frames": math.ceil(math.ceil(duration) * RENDERING_CONFIG.fps),
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Windowed pipeline memory benchmark")
+    parser.add_argument("--durations", type=float, nargs="+", default=[60, 300, 900, 1800],
+                        help="Input durations in seconds")
+    parser.add_argument("--renderer", choices=["stub", "wav2lip"], default="stub",
+                        help="Window renderer (default: stub, no model needed)")
+    parser.add_argument("--video", type=Path, help="Avatar video (default: a synthetic 5 s clip)")
+    parser.add_argument("--window-seconds", type=float, default=None, help="Window length")
+    parser.add_argument("--worker", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        worker(args.worker, args.renderer, args.video, args.window_seconds)
+        return 0
+
+    if args.renderer == "wav2lip" and args.video is None:
+        print("❌ --renderer wav2lip needs --video with a visible face")
+        return 1
+
+    print("\n" + "="*72)
+    print(f"📊 Peak RSS vs. input duration (process_in_windows, {args.renderer} renderer)")
+    print("="*72)
+    print(f"{'duration (s)':>12} | {'peak MB':>8} | {'growth MB':>9} | {'ffmpeg MB':>9} | "
+          f"{'wall s':>7} | {'frames':>13}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video or Path(tmp) / "avatar.mp4"
+        if args.video is None:
+            synth_avatar(video)
+
+        for duration in args.durations:
+            cmd = [sys.executable, __file__, "--worker", str(duration),
+                   "--renderer", args.renderer, "--video", str(video)]
+            if args.window_seconds:
+                cmd += ["--window-seconds", str(args.window_seconds)]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"❌ {duration:.0f}s run failed:\n{result.stderr}")
+                return 1
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            frames = f"{stats['frames']}/{stats['expected_frames']}"
+            print(f"{duration:>12.0f} | {stats['peak_mb']:>8.1f} | "
+                  f"{stats['peak_mb'] - stats['baseline_mb']:>9.1f} | {stats['ffmpeg_peak_mb']:>9.1f} | "
+                  f"{stats['seconds']:>7.2f} | {frames:>13}")
+
+    print("\nGrowth should stay flat with duration; frames should match the audio exactly.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
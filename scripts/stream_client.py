@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Loopback client for the live streaming server
+
+Streams an audio file (or a line of text) to ``/ws/speak`` in real time and
+reports glass-to-glass latency percentiles: the time from sending an audio
+packet to receiving each frame rendered from it.
+
+Usage:
+    # Start a server in-process and stream a file through it
+    python scripts/stream_client.py --serve --source data/raw/training_video.mp4 \
+        --audio data/raw/voice_reference.wav
+
+    # Connect to an already running server
+    python scripts/stream_client.py --url ws://127.0.0.1:7861/ws/speak --text "Hello there"
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.config import AUDIO_CONFIG, INTERFACE_CONFIG
+from src.streaming.ingest import iter_audio_chunks
+from src.streaming.server import create_app, decode_frame
+
+PACKET_SECONDS = 0.02
+
+
+def start_server(source: Path, port: int):
+    """Run the streaming server on a background thread and wait until it listens"""
+    import uvicorn
+
+    config = uvicorn.Config(create_app(source), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def send_audio(ws, audio_path: Path):
+    """Send PCM packets paced at real time, each stamped with its send time"""
+    packet_samples = int(AUDIO_CONFIG.sample_rate * PACKET_SECONDS)
+    for chunk in iter_audio_chunks(audio_path, packet_samples):
+        pcm = (np.clip(chunk, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+        await ws.send(struct.pack(">d", time.time()) + pcm)
+        await asyncio.sleep(PACKET_SECONDS)
+    await ws.send(json.dumps({"type": "end"}))
+
+
+async def send_text(ws, text: str):
+    await ws.send(json.dumps({"type": "text", "text": text, "t_in": time.time()}))
+    await ws.send(json.dumps({"type": "end"}))
+
+
+async def receive_frames(ws, save_dir=None):
+    """Collect per-frame latencies until the server signals the end of the stream"""
+    latencies = []
+    summary = {}
+    first_frame = last_frame = None
+    async for message in ws:
+        if isinstance(message, str):
+            summary = json.loads(message)
+            break
+        now = time.time()
+        header, jpeg = decode_frame(message)
+        latencies.append(now - header["t_in"])
+        first_frame = first_frame or now
+        last_frame = now
+        if save_dir:
+            (save_dir / f"{header['index']:06d}.jpg").write_bytes(jpeg)
+    return latencies, summary, first_frame, last_frame
+
+
+async def run(args):
+    import websockets
+
+    if args.save_dir:
+        args.save_dir.mkdir(parents=True, exist_ok=True)
+
+    async with websockets.connect(args.url, max_size=None) as ws:
+        sender = send_audio(ws, args.audio) if args.audio else send_text(ws, args.text)
+        _, (latencies, summary, first_frame, last_frame) = await asyncio.gather(
+            sender, receive_frames(ws, args.save_dir)
+        )
+
+    print("\n" + "="*60)
+    print("📊 STREAMING SUMMARY")
+    print("="*60)
+    if not latencies:
+        print("❌ No frames received")
+        return 1
+
+    ms = np.array(latencies) * 1000
+    span = (last_frame - first_frame) if last_frame > first_frame else 0.0
+    print(f"Frames received: {len(ms)} (server dropped {summary.get('dropped', 0)})")
+    if span:
+        print(f"Delivered FPS:   {(len(ms) - 1) / span:.1f}")
+    for p in (50, 90, 95, 99):
+        print(f"Latency p{p}:    {np.percentile(ms, p):8.1f} ms")
+    print(f"Latency max:    {ms.max():8.1f} ms")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loopback client for the live streaming server")
+    parser.add_argument("--url", type=str, default=f"ws://127.0.0.1:{INTERFACE_CONFIG.stream_port}/ws/speak")
+    parser.add_argument("--audio", type=Path, help="Audio file to stream in real time")
+    parser.add_argument("--text", type=str, help="Text to synthesize server-side")
+    parser.add_argument("--serve", action="store_true", help="Start a local server in-process")
+    parser.add_argument("--source", type=Path, help="Avatar source for --serve")
+    parser.add_argument("--save-dir", type=Path, help="Write received JPEG frames here")
+    args = parser.parse_args()
+
+    if not args.audio and not args.text:
+        print("❌ Must provide either --audio or --text")
+        return 1
+
+    if args.serve:
+        if not args.source or not args.source.exists():
+            print("❌ --serve requires an existing --source")
+            return 1
+        start_server(args.source, INTERFACE_CONFIG.stream_port)
+        args.url = f"ws://127.0.0.1:{INTERFACE_CONFIG.stream_port}/ws/speak"
+
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -59,6 +59,11 @@ class AudioConfig:
     hop_length: int = 512
     n_mels: int = 80
 
+    # Streaming ingestion: long inputs are decoded and processed in windows
+    stream_window_seconds: float = 10.0
+    stream_min_duration: float = 60.0  # Inputs shorter than this are processed in one pass
+    stream_live_window_seconds: float = 0.2  # Window size for the live streaming server
+
     # TTS settings (using edge-tts for Python 3.12 compatibility)
     tts_engine: str = "edge-tts"  # Using Microsoft Edge TTS (Python 3.12 compatible)
     tts_voice: str = "en-US-AriaNeural"  # Default voice
@@ -79,6 +84,18 @@ class RenderingConfig:
     # Post-processing
     use_face_enhancement: bool = True
     use_super_resolution: bool = False
+    # Feathered paste of generated mouth crops. Kept separate from use_face_enhancement,
+    # which switches GFPGAN restoration; False falls back to a hard paste.
+    use_blending: bool = True
+    blend_feather: float = 0.15  # Fraction of the crop edge faded into the frame
+    box_smoothing_window: int = 5  # Frames averaged when smoothing face boxes
+    crossfade_frames: int = 3  # Fade-in length at stitched segment boundaries (0 disables)
+
+    # Face enhancement (GFPGAN) scheduling: "all", "keyframes" or "off"
+    enhancement_mode: str = "keyframes"
+    enhancement_threshold: float = 4.0  # Mean mouth-region change (0-255) that triggers a new keyframe
+    enhancement_max_interval: int = 12  # Force a keyframe at least this often (frames)
+    enhancement_batch_size: int = 8  # Face crops per enhancer forward pass
 
     # Video export
     video_codec: str = "libx264"
@@ -86,11 +103,18 @@ class RenderingConfig:
     audio_codec: str = "aac"
     audio_bitrate: str = "192k"
 
+    # Live streaming
+    stream_jpeg_quality: int = 80
+    stream_jitter_buffer_frames: int = 5  # Frames buffered before playback starts
+    stream_max_buffer_frames: int = 25  # Queued frames before rendering waits (~1s at 25 fps)
+    stream_drop_policy: str = "drop_late"  # "drop_late" (skip frames behind the playout clock) or "none"
+
 @dataclass
 class InterfaceConfig:
     """Configuration for Gradio interface"""
     host: str = "0.0.0.0"
     port: int = 7860
+    stream_port: int = 7861
     share: bool = False
     debug: bool = False
 
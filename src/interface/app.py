@@ -10,9 +10,15 @@ import sys
 from pathlib import Path
 import tempfile
 import shutil
+from functools import partial
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from baseline_wav2lip import Wav2LipError, run_wav2lip
+from src.postprocess.enhancement import enhance_video, resolve_mode
+from src.streaming.ingest import process_in_windows, should_stream
 
 # Custom CSS
 custom_css = """
@@ -109,53 +115,85 @@ def generate_video_wav2lip(video_file, audio_file):
         output_path = PROJECT_ROOT / "outputs" / "videos" / f"wav2lip_{Path(video_path).stem}.mp4"
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        cmd = [
-            "python", str(PROJECT_ROOT / "scripts" / "baseline_wav2lip.py"),
-            "--video", video_path,
-            "--audio", audio_path,
-            "--output", str(output_path)
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # Rendered in-process so the model stays loaded between requests; errors carry the reason
+        if should_stream(Path(audio_path)):
+            success = process_in_windows(video_path, audio_path, output_path, run_wav2lip, cut_video=False)
+        else:
+            success = run_wav2lip(Path(video_path), Path(audio_path), output_path)
 
-        if result.returncode == 0 and output_path.exists():
+        if success and output_path.exists():
             return str(output_path), "✅ Wav2Lip generation successful!"
         else:
-            return None, f"❌ Error: {result.stderr}"
+            return None, "❌ Error: Wav2Lip did not produce a video"
+    except Wav2LipError as e:
+        return None, f"❌ Error: {e}"
     except Exception as e:
         return None, f"❌ Exception: {str(e)}"
 
-def generate_video_sadtalker(video_file, audio_file, use_enhancer=True):
-    """Generate video using SadTalker"""
-    try:
-        # Gradio passes file paths as strings
-        video_path = video_file if isinstance(video_file, str) else video_file.name
-        audio_path = audio_file if isinstance(audio_file, str) else audio_file.name
+class SadTalkerError(RuntimeError):
+    """SadTalker exited without producing a video; carries its stderr"""
+
 
-        sadtalker_dir = PROJECT_ROOT / "external" / "SadTalker"
-        output_dir = PROJECT_ROOT / "outputs" / "videos"
-        output_dir.mkdir(parents=True, exist_ok=True)
+def run_sadtalker(source_path, audio_path, output_path, use_enhancer=True):
+    """
+    Run SadTalker on one source/audio pair and move the result to output_path.
 
+    Raises SadTalkerError with SadTalker's stderr if no video was produced.
+    """
+    sadtalker_dir = PROJECT_ROOT / "external" / "SadTalker"
+    output_path = Path(output_path)
+
+    # SadTalker names its output with a timestamp, so give each run its own result dir
+    with tempfile.TemporaryDirectory(prefix="sadtalker_") as result_dir:
+        # GFPGAN runs afterwards through the enhancement scheduler instead of
+        # SadTalker's --enhancer, which restores every full frame
         cmd = [
             "python", str(sadtalker_dir / "inference.py"),
-            "--driven_audio", audio_path,
-            "--source_image", video_path,
-            "--result_dir", str(output_dir),
+            "--driven_audio", str(audio_path),
+            "--source_image", str(source_path),
+            "--result_dir", result_dir,
         ]
 
-        if use_enhancer:
-            cmd.append("--enhancer")
-            cmd.append("gfpgan")
-
         result = subprocess.run(cmd, capture_output=True, text=True, cwd=sadtalker_dir)
 
-        # Find the generated video (SadTalker names it with timestamp)
-        videos = sorted(output_dir.glob("*.mp4"), key=lambda x: x.stat().st_mtime, reverse=True)
+        videos = sorted(Path(result_dir).rglob("*.mp4"), key=lambda x: x.stat().st_mtime, reverse=True)
+        if not videos:
+            raise SadTalkerError(result.stderr)
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        mode = resolve_mode(use_enhancer)
+        if mode == "off":
+            shutil.move(str(videos[0]), output_path)
+        else:
+            stats = enhance_video(videos[0], output_path, mode)
+            print(f"✨ Enhanced ({mode}): {stats}")
+        return True
+
+def generate_video_sadtalker(video_file, audio_file, use_enhancer=True):
+    """Generate video using SadTalker"""
+    try:
+        # Gradio passes file paths as strings
+        video_path = video_file if isinstance(video_file, str) else video_file.name
+        audio_path = audio_file if isinstance(audio_file, str) else audio_file.name
+
+        output_path = PROJECT_ROOT / "outputs" / "videos" / f"sadtalker_{Path(video_path).stem}.mp4"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Long narration is rendered window by window to keep memory flat
+        if should_stream(Path(audio_path)):
+            success = process_in_windows(
+                video_path, audio_path, output_path,
+                partial(run_sadtalker, use_enhancer=use_enhancer),
+            )
+        else:
+            success = run_sadtalker(video_path, audio_path, output_path, use_enhancer)
 
-        if videos:
-            return str(videos[0]), "✅ SadTalker generation successful!"
+        if success and output_path.exists():
+            return str(output_path), "✅ SadTalker generation successful!"
         else:
-            return None, f"❌ Error: {result.stderr}"
+            return None, "❌ Error: SadTalker did not produce a video"
+    except SadTalkerError as e:
+        return None, f"❌ Error: {e}"
     except Exception as e:
         return None, f"❌ Exception: {str(e)}"
 
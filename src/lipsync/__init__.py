@@ -0,0 +1 @@
+"""Lip-sync model runners"""
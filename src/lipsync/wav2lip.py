@@ -0,0 +1,319 @@
+"""
+In-process Wav2Lip runner
+
+Wav2Lip's own ``inference.py`` reloads the checkpoint and re-runs face
+detection on every call. This module keeps the model resident and caches the
+avatar's frames and face boxes so many audio tracks (or windows of one long
+track) can be rendered against one avatar cheaply. The CLI, the Gradio app,
+the batch renderer and the live server all render through it.
+Inference and compositing/encoding are separate steps so callers can overlap
+them; compositing goes through src.postprocess.blending.
+"""
+
+import hashlib
+import math
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from src.config import EXTERNAL_DIR, PROCESSED_DATA_DIR, RENDERING_CONFIG
+from src.postprocess.blending import blend_crops, smooth_boxes
+from src.streaming.ingest import IMAGE_SUFFIXES, iter_video_frames
+
+WAV2LIP_DIR = EXTERNAL_DIR / "Wav2Lip"
+FACE_CACHE_DIR = PROCESSED_DATA_DIR / "face_cache"
+
+MEL_STEP_SIZE = 16
+MEL_FPS = 80  # Mel frames per second (16 kHz audio, hop 200)
+IMG_SIZE = 96
+BLEND_CHUNK_FRAMES = 32
+DEFAULT_PADS = (0, 10, 0, 0)  # Top, bottom, left, right (matches baseline_wav2lip.py)
+
+
+def _import_wav2lip():
+    """Make Wav2Lip's top-level modules (models, audio, face_detection) importable"""
+    if not WAV2LIP_DIR.exists():
+        raise FileNotFoundError(f"Wav2Lip not found at {WAV2LIP_DIR}. Run setup_runpod.sh first!")
+    if str(WAV2LIP_DIR) not in sys.path:
+        sys.path.insert(0, str(WAV2LIP_DIR))
+
+
+@dataclass
+class AvatarCache:
+    """Decoded avatar frames with their face boxes, shared across jobs"""
+    frames: List[np.ndarray]
+    boxes: np.ndarray  # (N, 4) as x1, y1, x2, y2
+    fps: float
+
+
+class Wav2LipRunner:
+    """Wav2Lip model kept in memory with a per-avatar face cache"""
+
+    def __init__(
+        self,
+        checkpoint_path: Optional[Path] = None,
+        device: Optional[str] = None,
+        batch_size: int = 128,
+        face_det_batch_size: int = 16,
+        pads: Tuple[int, int, int, int] = DEFAULT_PADS,
+        max_avatars: int = 1,
+    ):
+        _import_wav2lip()
+        self.checkpoint_path = Path(checkpoint_path or WAV2LIP_DIR / "checkpoints" / "wav2lip_gan.pth")
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.batch_size = batch_size
+        self.face_det_batch_size = face_det_batch_size
+        self.pads = pads
+        self.model = self._load_model()
+        # Serialises model calls when several threads share the runner
+        self.lock = threading.Lock()
+        # Fully decoded avatars, least recently used first
+        self.max_avatars = max_avatars
+        self._avatars: "OrderedDict[Tuple[str, int], AvatarCache]" = OrderedDict()
+
+    def _load_model(self):
+        from models import Wav2Lip
+
+        checkpoint = torch.load(self.checkpoint_path, map_location=self.device)
+        state = {k.replace("module.", ""): v for k, v in checkpoint["state_dict"].items()}
+        model = Wav2Lip()
+        model.load_state_dict(state)
+        return model.to(self.device).eval()
+
+    def _cache_key(self, video_path: Path) -> str:
+        stat = video_path.stat()
+        # "raw": the disk cache holds unsmoothed boxes, so it is independent of box_smoothing_window
+        key = f"{video_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{self.pads}:raw"
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def load_avatar(
+        self,
+        video_path: Path,
+        start_time: float = 0.0,
+        duration: Optional[float] = None,
+    ) -> AvatarCache:
+        """
+        Decode the avatar and its face boxes.
+
+        Without ``duration`` the whole video is decoded and kept resident for
+        reuse; only the ``max_avatars`` most recently used stay in memory. With
+        ``duration`` only the frames covering that window (looping like
+        Wav2Lip) are decoded and nothing is kept, so windowed rendering of a
+        long input holds one window of frames at a time.
+
+        Raw detections are cached on disk and smoothed on load, so changing
+        ``box_smoothing_window`` takes effect without re-running detection.
+        """
+        video_path = Path(video_path)
+        key = self._cache_key(video_path)
+        window = RENDERING_CONFIG.box_smoothing_window
+        if duration is None and (key, window) in self._avatars:
+            self._avatars.move_to_end((key, window))
+            return self._avatars[(key, window)]
+
+        fps = self._probe_fps(video_path)
+        boxes = smooth_boxes(self._load_boxes(key, video_path), window)
+
+        if duration is not None:
+            start = round(start_time * fps)
+            count = math.ceil(round(duration * fps, 6))
+            idx = (start + np.arange(count)) % len(boxes)
+            frames = self._read_frames(video_path, set(idx.tolist()))
+            return AvatarCache([frames[i] for i in idx], boxes[idx], fps)
+
+        # Evict before decoding so two full avatars are never resident at once
+        while self._avatars and len(self._avatars) >= self.max_avatars:
+            self._avatars.popitem(last=False)
+        frames = self._read_frames(video_path)
+        avatar = AvatarCache([frames[i] for i in range(len(frames))], boxes, fps)
+        if self.max_avatars > 0:
+            self._avatars[(key, window)] = avatar
+        return avatar
+
+    @staticmethod
+    def _probe_fps(video_path: Path) -> float:
+        if video_path.suffix.lower() in IMAGE_SUFFIXES:
+            return RENDERING_CONFIG.fps
+        cap = cv2.VideoCapture(str(video_path))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return fps or RENDERING_CONFIG.fps
+
+    @staticmethod
+    def _read_frames(video_path: Path, wanted: Optional[Set[int]] = None) -> Dict[int, np.ndarray]:
+        """Decode frames by index, keeping only ``wanted`` ones when given"""
+        if video_path.suffix.lower() in IMAGE_SUFFIXES:
+            # A still image is a one-frame avatar; frame indices wrap onto it
+            frame = cv2.imread(str(video_path))
+            frames = {} if frame is None else {0: frame}
+        else:
+            cap = cv2.VideoCapture(str(video_path))
+            frames = {}
+            i = 0
+            while wanted is None or len(frames) < len(wanted):
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if wanted is None or i in wanted:
+                    frames[i] = frame
+                i += 1
+            cap.release()
+        if not frames:
+            raise ValueError(f"Could not read frames from {video_path}")
+        return frames
+
+    def _load_boxes(self, key: str, video_path: Path) -> np.ndarray:
+        """Raw face boxes for every frame, from the disk cache or a streamed detection pass"""
+        box_path = FACE_CACHE_DIR / f"{key}.npy"
+        if box_path.exists():
+            return np.load(box_path)
+
+        if video_path.suffix.lower() in IMAGE_SUFFIXES:
+            batches = [self._read_frames(video_path)[0][None]]
+        else:
+            batches = iter_video_frames(video_path, self.face_det_batch_size)
+        raw_boxes = self._detect_faces(batches)
+        FACE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.save(box_path, raw_boxes)
+        return raw_boxes
+
+    def _detect_faces(self, batches: Iterable[np.ndarray]) -> np.ndarray:
+        """Padded face boxes for (n, H, W, 3) frame batches, decoded one batch at a time"""
+        import face_detection
+
+        detector = face_detection.FaceAlignment(
+            face_detection.LandmarksType._2D, flip_input=False, device=self.device
+        )
+        pad_top, pad_bottom, pad_left, pad_right = self.pads
+        boxes = []
+        for batch in batches:
+            for rect, image in zip(detector.get_detections_for_batch(batch), batch):
+                if rect is None:
+                    raise ValueError("Face not detected! Ensure the video contains a face in all frames.")
+                boxes.append([
+                    max(0, rect[0] - pad_left),
+                    max(0, rect[1] - pad_top),
+                    min(image.shape[1], rect[2] + pad_right),
+                    min(image.shape[0], rect[3] + pad_bottom),
+                ])
+        del detector
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return np.array(boxes)
+
+    def mel_chunks(self, audio_path: Path, fps: float, num_frames: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Split the audio's mel spectrogram into one 16-step window per video frame.
+
+        Returns exactly ``num_frames`` windows, by default ceil(duration * fps).
+        Wav2Lip's inference.py stops at the last full window instead, which
+        loses ~3 frames per clip and drifts when windows are stitched; frames
+        near the end reuse the last full window, as the live renderer does.
+        """
+        import audio
+
+        wav = audio.load_wav(str(audio_path), 16000)
+        mel = audio.melspectrogram(wav)
+        if np.isnan(mel.reshape(-1)).sum() > 0:
+            raise ValueError("Mel contains nan! Using a TTS voice? Add a small epsilon noise to the wav file.")
+        if mel.shape[1] < MEL_STEP_SIZE:
+            mel = np.pad(mel, ((0, 0), (0, MEL_STEP_SIZE - mel.shape[1])), mode="edge")
+
+        if num_frames is None:
+            # Rounded first so float fps (e.g. 25.0 from OpenCV) cannot tip an exact count over
+            num_frames = math.ceil(round(len(wav) * fps / 16000, 6))
+        step = MEL_FPS / fps
+        last = mel.shape[1] - MEL_STEP_SIZE
+        starts = [min(int(i * step), last) for i in range(num_frames)]
+        return [mel[:, start:start + MEL_STEP_SIZE] for start in starts]
+
+    @torch.no_grad()
+    def infer(
+        self,
+        avatar: AvatarCache,
+        audio_path: Path,
+        start_frame: int = 0,
+        num_frames: Optional[int] = None,
+    ) -> np.ndarray:
+        """Predict mouth crops (N, 96, 96, 3) uint8 for every audio frame"""
+        return self.infer_mels(avatar, self.mel_chunks(audio_path, avatar.fps, num_frames), start_frame)
+
+    @torch.no_grad()
+    def infer_mels(self, avatar: AvatarCache, mels: List[np.ndarray], start_frame: int = 0) -> np.ndarray:
+        """Predict mouth crops for per-frame mel windows, starting at avatar frame ``start_frame``"""
+        preds = []
+        for start in range(0, len(mels), self.batch_size):
+            count = min(self.batch_size, len(mels) - start)
+            idx = (start_frame + start + np.arange(count)) % len(avatar.frames)
+            faces = []
+            for j in idx:
+                x1, y1, x2, y2 = avatar.boxes[j]
+                faces.append(cv2.resize(avatar.frames[j][y1:y2, x1:x2], (IMG_SIZE, IMG_SIZE)))
+            faces = np.stack(faces)
+            masked = faces.copy()
+            masked[:, IMG_SIZE // 2:] = 0
+            img_batch = np.concatenate((masked, faces), axis=3) / 255.0
+            mel_batch = np.stack(mels[start:start + count])[..., None]
+
+            img_t = torch.FloatTensor(np.transpose(img_batch, (0, 3, 1, 2))).to(self.device)
+            mel_t = torch.FloatTensor(np.transpose(mel_batch, (0, 3, 1, 2))).to(self.device)
+            with self.lock:
+                pred = self.model(mel_t, img_t).cpu().numpy().transpose(0, 2, 3, 1) * 255.0
+            preds.append(pred.astype(np.uint8))
+        return np.concatenate(preds)
+
+    @staticmethod
+    def composite(avatar: AvatarCache, preds: np.ndarray, start_frame: int = 0) -> np.ndarray:
+        """Blend predicted crops into the avatar frames starting at ``start_frame``"""
+        idx = (start_frame + np.arange(len(preds))) % len(avatar.frames)
+        frames = np.stack([avatar.frames[j] for j in idx])
+        return blend_crops(frames, preds, avatar.boxes[idx])
+
+    @classmethod
+    def encode(
+        cls,
+        avatar: AvatarCache,
+        preds: np.ndarray,
+        audio_path: Path,
+        output_path: Path,
+        start_frame: int = 0,
+    ):
+        """Paste predicted crops back onto the avatar frames and mux with the audio"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        h, w = avatar.frames[0].shape[:2]
+
+        with tempfile.TemporaryDirectory(prefix="wav2lip_") as tmp:
+            silent = Path(tmp) / "result.avi"
+            writer = cv2.VideoWriter(str(silent), cv2.VideoWriter_fourcc(*"DIVX"), avatar.fps, (w, h))
+            # Composite in chunks so the blend runs on whole frame tensors
+            for start in range(0, len(preds), BLEND_CHUNK_FRAMES):
+                chunk = preds[start:start + BLEND_CHUNK_FRAMES]
+                for frame in cls.composite(avatar, chunk, start_frame + start):
+                    writer.write(frame)
+            writer.release()
+
+            cmd = [
+                "ffmpeg", "-v", "error", "-nostdin", "-y",
+                "-i", str(audio_path), "-i", str(silent),
+                "-c:v", RENDERING_CONFIG.video_codec,
+                "-c:a", RENDERING_CONFIG.audio_codec, "-b:a", RENDERING_CONFIG.audio_bitrate,
+                str(output_path),
+            ]
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+
+
+@lru_cache(maxsize=1)
+def get_runner(checkpoint_path: Optional[Path] = None) -> Wav2LipRunner:
+    """Process-wide runner so the Wav2Lip weights are loaded once"""
+    return Wav2LipRunner(checkpoint_path)
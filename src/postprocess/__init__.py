@@ -0,0 +1 @@
+"""Post-processing of generated frames"""
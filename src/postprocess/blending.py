@@ -0,0 +1,274 @@
+"""
+Vectorized temporal smoothing and blending of generated mouth regions
+
+Wav2Lip-style pipelines paste each generated crop back one frame at a time
+with a hard edge, and windowed rendering stitches segments that visibly pop
+at their boundaries. The operations here work on whole frame tensors at once:
+
+- ``smooth_boxes``: moving-average face boxes via a cumulative sum
+- ``blend_crops``: warp every crop into its frame with one ``grid_sample``
+  call and composite through a feathered mask
+- ``blend_aligned_crops``: the same for crops taken with a per-frame affine
+  (e.g. landmark-aligned faces), pasted back through its inverse
+- ``crossfade_boundaries``: fade each new segment in from the last frame of
+  the previous one, for all boundaries in a single indexed blend
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from src.config import RENDERING_CONFIG
+
+
+def smooth_boxes(boxes: np.ndarray, window: Optional[int] = None) -> np.ndarray:
+    """
+    Temporal mean of (N, 4) boxes over a forward window of ``window`` frames.
+
+    Matches Wav2Lip's get_smoothened_boxes: frame i averages boxes[i:i+window],
+    and the last frames reuse the final full window. Wav2Lip smooths in place,
+    so those tail windows already contain smoothed boxes; the few tail frames
+    are replayed in that order to give identical results.
+    """
+    window = RENDERING_CONFIG.box_smoothing_window if window is None else window
+    n = len(boxes)
+    if n == 0 or window <= 1:
+        return boxes.astype(np.int64)
+    window = min(window, n)
+
+    csum = np.concatenate([np.zeros((1, boxes.shape[1])), np.cumsum(boxes, axis=0, dtype=np.float64)])
+    starts = np.minimum(np.arange(n), n - window)
+    means = (csum[starts + window] - csum[starts]) / window
+    out = means.astype(np.int64)
+
+    tail = n - window
+    window_boxes = boxes[tail:].astype(np.int64)
+    window_boxes[0] = out[tail]
+    for k in range(1, window):
+        window_boxes[k] = out[tail + k] = window_boxes.mean(axis=0).astype(np.int64)
+    return out
+
+
+def feather_mask(height: int, width: int, feather: float) -> np.ndarray:
+    """(height, width) float32 mask ramping from 0 at the edges to 1 over ``feather`` of each side"""
+    if feather <= 0:
+        return np.ones((height, width), dtype=np.float32)
+    ramp_y = np.clip((np.minimum(np.arange(height), np.arange(height)[::-1]) + 0.5) / (feather * height), 0, 1)
+    ramp_x = np.clip((np.minimum(np.arange(width), np.arange(width)[::-1]) + 0.5) / (feather * width), 0, 1)
+    return np.outer(ramp_y, ramp_x).astype(np.float32)
+
+
+def blend_crops(
+    frames: np.ndarray,
+    crops: np.ndarray,
+    boxes: np.ndarray,
+    feather: Optional[float] = None,
+    device: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Composite generated crops back into their frames in one pass.
+
+    Args:
+        frames: (N, H, W, 3) uint8 target frames
+        crops: (N, h, w, 3) uint8 generated crops (e.g. Wav2Lip's 96x96 output)
+        boxes: (N, 4) x1, y1, x2, y2 placement of each crop
+        feather: Fraction of the crop over which edges fade in (0 = hard paste)
+
+    Returns:
+        (N, H, W, 3) uint8 blended frames
+    """
+    if feather is None:
+        feather = RENDERING_CONFIG.blend_feather if RENDERING_CONFIG.use_blending else 0.0
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+    n = len(frames)
+    crop_h, crop_w = crops.shape[1:3]
+
+    # Only the union of all boxes can change, so warp and composite just that region
+    boxes = np.asarray(boxes)
+    ux1, uy1 = max(0, int(boxes[:, 0].min())), max(0, int(boxes[:, 1].min()))
+    ux2, uy2 = min(frames.shape[2], int(boxes[:, 2].max())), min(frames.shape[1], int(boxes[:, 3].max()))
+    height, width = uy2 - uy1, ux2 - ux1
+
+    base = torch.from_numpy(frames[:, uy1:uy2, ux1:ux2]).to(device).permute(0, 3, 1, 2).float()
+    src = torch.from_numpy(crops).to(device).permute(0, 3, 1, 2).float()
+    mask = torch.from_numpy(feather_mask(crop_h, crop_w, feather)).to(device)
+    src = torch.cat([src, mask.expand(n, 1, crop_h, crop_w)], dim=1)
+
+    # Sampling grid mapping each region pixel into its crop's [-1, 1] space
+    box = torch.as_tensor(boxes - [ux1, uy1, ux1, uy1], dtype=torch.float32, device=device)
+    x1, y1, x2, y2 = (box[:, i].view(n, 1, 1) for i in range(4))
+    xs = torch.arange(width, device=device, dtype=torch.float32).view(1, 1, width) + 0.5
+    ys = torch.arange(height, device=device, dtype=torch.float32).view(1, height, 1) + 0.5
+    gx = ((xs - x1) / (x2 - x1).clamp(min=1)) * 2 - 1
+    gy = ((ys - y1) / (y2 - y1).clamp(min=1)) * 2 - 1
+    grid = torch.stack([gx.expand(n, height, width), gy.expand(n, height, width)], dim=-1)
+
+    # Border padding keeps edge pixels at full strength (like cv2.resize); pixels
+    # whose centres fall outside each box are masked out so only the crop region changes
+    warped = F.grid_sample(src, grid, mode="bilinear", padding_mode="border", align_corners=False)
+    inside = ((xs > x1) & (xs < x2) & (ys > y1) & (ys < y2)).unsqueeze(1)
+    rgb, alpha = warped[:, :3], warped[:, 3:] * inside
+    region = base * (1 - alpha) + rgb * alpha
+
+    out = frames.copy()
+    out[:, uy1:uy2, ux1:ux2] = region.round().clamp(0, 255).byte().permute(0, 2, 3, 1).cpu().numpy()
+    return out
+
+
+def blend_aligned_crops(
+    frames: np.ndarray,
+    crops: np.ndarray,
+    affines: np.ndarray,
+    feather: Optional[float] = None,
+    device: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Composite crops that were cut with ``cv2.warpAffine`` back into their frames.
+
+    Args:
+        frames: (N, H, W, 3) uint8 target frames
+        crops: (N, h, w, 3) uint8 crops, e.g. restored 512x512 aligned faces
+        affines: (N, 2, 3) frame -> crop transforms the crops were warped with
+        feather: Fraction of the crop over which edges fade in (0 = hard paste)
+
+    Returns:
+        (N, H, W, 3) uint8 blended frames
+    """
+    if feather is None:
+        feather = RENDERING_CONFIG.blend_feather if RENDERING_CONFIG.use_blending else 0.0
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+    n = len(frames)
+    crop_h, crop_w = crops.shape[1:3]
+    affines = np.asarray(affines, dtype=np.float64)
+
+    # Only the union of the crops' footprints can change, so sample just that region
+    corners = np.array([[0, 0, 1], [crop_w, 0, 1], [0, crop_h, 1], [crop_w, crop_h, 1]], dtype=np.float64)
+    footprint = np.concatenate([corners @ _invert_affine(a).T for a in affines])
+    ux1, uy1 = max(0, int(np.floor(footprint[:, 0].min()))), max(0, int(np.floor(footprint[:, 1].min())))
+    ux2 = min(frames.shape[2], int(np.ceil(footprint[:, 0].max())) + 1)
+    uy2 = min(frames.shape[1], int(np.ceil(footprint[:, 1].max())) + 1)
+    if ux2 <= ux1 or uy2 <= uy1:
+        return frames.copy()
+    height, width = uy2 - uy1, ux2 - ux1
+
+    base = torch.from_numpy(frames[:, uy1:uy2, ux1:ux2]).to(device).permute(0, 3, 1, 2).float()
+    src = torch.from_numpy(crops).to(device).permute(0, 3, 1, 2).float()
+    mask = torch.from_numpy(feather_mask(crop_h, crop_w, feather)).to(device)
+    src = torch.cat([src, mask.expand(n, 1, crop_h, crop_w)], dim=1)
+
+    # Map each region pixel (cv2 convention: integer centres) into crop pixel space
+    a = torch.as_tensor(affines, dtype=torch.float32, device=device)
+    xs = torch.arange(ux1, ux2, device=device, dtype=torch.float32).view(1, 1, width)
+    ys = torch.arange(uy1, uy2, device=device, dtype=torch.float32).view(1, height, 1)
+    cx = a[:, 0, 0].view(n, 1, 1) * xs + a[:, 0, 1].view(n, 1, 1) * ys + a[:, 0, 2].view(n, 1, 1)
+    cy = a[:, 1, 0].view(n, 1, 1) * xs + a[:, 1, 1].view(n, 1, 1) * ys + a[:, 1, 2].view(n, 1, 1)
+    grid = torch.stack([(2 * cx + 1) / crop_w - 1, (2 * cy + 1) / crop_h - 1], dim=-1)
+
+    warped = F.grid_sample(src, grid, mode="bilinear", padding_mode="border", align_corners=False)
+    inside = ((cx > -0.5) & (cx < crop_w - 0.5) & (cy > -0.5) & (cy < crop_h - 0.5)).unsqueeze(1)
+    rgb, alpha = warped[:, :3], warped[:, 3:] * inside
+    region = base * (1 - alpha) + rgb * alpha
+
+    out = frames.copy()
+    out[:, uy1:uy2, ux1:ux2] = region.round().clamp(0, 255).byte().permute(0, 2, 3, 1).cpu().numpy()
+    return out
+
+
+def _invert_affine(affine: np.ndarray) -> np.ndarray:
+    """Inverse of a 2x3 affine, as cv2.invertAffineTransform"""
+    linear = np.linalg.inv(affine[:, :2])
+    return np.hstack([linear, -linear @ affine[:, 2:]])
+
+
+def crossfade_boundaries(
+    frames: np.ndarray,
+    boundaries: Iterable[int],
+    fade_frames: Optional[int] = None,
+    offset: int = 0,
+    anchors: Optional[Dict[int, np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Fade each segment in from the last frame of the segment before it.
+
+    ``boundaries`` are global frame indices where a new segment starts. For
+    streaming, pass successive chunks with their global ``offset`` and a
+    shared ``anchors`` dict so fades can straddle chunk edges.
+
+    Returns a new (N, H, W, 3) uint8 array.
+    """
+    fade_frames = RENDERING_CONFIG.crossfade_frames if fade_frames is None else fade_frames
+    anchors = {} if anchors is None else anchors
+    n = len(frames)
+    out = frames.copy()
+    if fade_frames <= 0 or n == 0:
+        return out
+
+    targets: List[np.ndarray] = []
+    anchor_ids: List[np.ndarray] = []
+    alphas: List[np.ndarray] = []
+    anchor_frames: List[np.ndarray] = []
+
+    for b in sorted(boundaries):
+        # Remember the frame before the boundary when it passes through this chunk
+        if offset <= b - 1 < offset + n:
+            anchors[b] = frames[b - 1 - offset].copy()
+        if b not in anchors:
+            continue
+        steps = np.arange(fade_frames)
+        t = b + steps - offset
+        keep = (t >= 0) & (t < n)
+        if not keep.any():
+            continue
+        targets.append(t[keep])
+        alphas.append((steps[keep] + 1) / (fade_frames + 1))
+        anchor_ids.append(np.full(keep.sum(), len(anchor_frames)))
+        anchor_frames.append(anchors[b])
+
+    if not targets:
+        return out
+
+    t = np.concatenate(targets)
+    a = np.concatenate(alphas).astype(np.float32)[:, None, None, None]
+    held = np.stack(anchor_frames)[np.concatenate(anchor_ids)].astype(np.float32)
+    out[t] = np.round(held * (1 - a) + frames[t].astype(np.float32) * a).astype(np.uint8)
+    return out
+
+
+def count_frames(video_path: Path) -> int:
+    """Frame count from the container header"""
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
+
+
+def crossfade_video(
+    input_path: Path,
+    output_path: Path,
+    boundaries: List[int],
+    fade_frames: Optional[int] = None,
+    chunk_frames: int = 64,
+    audio_path: Optional[Path] = None,
+):
+    """
+    Apply ``crossfade_boundaries`` to a video file in bounded chunks.
+
+    Frames are streamed through ffmpeg, which re-encodes the video and copies
+    the input's audio track, or muxes ``audio_path`` when given.
+    """
+    from src.streaming.ingest import rewrite_video
+
+    anchors: Dict[int, np.ndarray] = {}
+    rewrite_video(
+        input_path, output_path,
+        lambda chunk, offset: crossfade_boundaries(chunk, boundaries, fade_frames, offset, anchors),
+        chunk_frames,
+        audio_path,
+    )
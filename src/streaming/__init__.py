@@ -0,0 +1 @@
+"""Streaming ingestion and processing for long and live inputs"""
@@ -0,0 +1,389 @@
+"""
+Bounded-memory audio/video ingestion
+
+Long inputs are never decoded in full. Audio is piped out of ffmpeg as mono
+PCM already resampled to ``AudioConfig.sample_rate``, and video frames are read
+one at a time through OpenCV. Both are exposed as generators of fixed-size
+windows so downstream stages (Wav2Lip, SadTalker, post-processing) can work
+window by window and memory stays flat regardless of input duration.
+"""
+
+import math
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+from src.config import AUDIO_CONFIG, RENDERING_CONFIG
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".webp"}
+
+# Signature of a per-window renderer: (video_segment, audio_segment, output_segment) -> success.
+# With process_in_windows(cut_video=False) it receives the full video plus start_time and
+# duration keywords (seconds).
+WindowRenderer = Callable[..., bool]
+
+# Signature of a frame transform for rewrite_video: (frames, global_offset) -> frames
+FrameTransform = Callable[[np.ndarray, int], np.ndarray]
+
+
+@dataclass
+class AudioWindow:
+    """One window of decoded audio, aligned to video frame boundaries"""
+    index: int
+    start_frame: int
+    num_frames: int
+    samples: np.ndarray  # float32 mono in [-1, 1]
+    sample_rate: int
+    fps: int
+
+    @property
+    def start_time(self) -> float:
+        return self.start_frame / self.fps
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+
+def _read_exact(stream, size: int) -> bytes:
+    """Read up to ``size`` bytes, looping over short pipe reads"""
+    parts = []
+    remaining = size
+    while remaining > 0:
+        part = stream.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+
+def probe_duration(path: Path) -> float:
+    """Return media duration in seconds using ffprobe (no decoding)"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        str(path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
+def frames_per_window(window_seconds: float, fps: int, sample_rate: int) -> int:
+    """Number of video frames per window, rounded so the window holds a whole number of samples"""
+    # sample_rate * frames / fps must be an integer for windows to stay sample-exact
+    step = fps // math.gcd(sample_rate, fps)
+    frames = max(step, round(window_seconds * fps / step) * step)
+    return frames
+
+
+def iter_audio_chunks(
+    path: Path,
+    chunk_samples: int,
+    sample_rate: Optional[int] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Decode ``path`` with ffmpeg and yield float32 mono chunks of ``chunk_samples``.
+
+    ffmpeg performs the resampling, so only one chunk is ever held in memory.
+    The final chunk may be shorter.
+    """
+    sample_rate = sample_rate or AUDIO_CONFIG.sample_rate
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin",
+        "-i", str(path),
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "s16le", "-",
+    ]
+    chunk_bytes = chunk_samples * 2
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            buf = _read_exact(proc.stdout, chunk_bytes)
+            if not buf:
+                break
+            # Drop a dangling odd byte from a truncated stream
+            buf = buf[: len(buf) - len(buf) % 2]
+            yield np.frombuffer(buf, dtype=np.int16).astype(np.float32) / 32768.0
+            if len(buf) < chunk_bytes:
+                break
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def iter_audio_windows(
+    path: Path,
+    window_seconds: Optional[float] = None,
+    fps: Optional[int] = None,
+    sample_rate: Optional[int] = None,
+) -> Iterator[AudioWindow]:
+    """Yield frame-aligned audio windows of roughly ``window_seconds`` each"""
+    window_seconds = window_seconds or AUDIO_CONFIG.stream_window_seconds
+    fps = fps or RENDERING_CONFIG.fps
+    sample_rate = sample_rate or AUDIO_CONFIG.sample_rate
+
+    frames = frames_per_window(window_seconds, fps, sample_rate)
+    chunk_samples = frames * sample_rate // fps
+
+    start_frame = 0
+    for index, samples in enumerate(iter_audio_chunks(path, chunk_samples, sample_rate)):
+        num_frames = math.ceil(len(samples) * fps / sample_rate)
+        yield AudioWindow(index, start_frame, num_frames, samples, sample_rate, fps)
+        start_frame += num_frames
+
+
+def iter_video_frames(path: Path, chunk_frames: int, loop: bool = False) -> Iterator[np.ndarray]:
+    """
+    Yield uint8 BGR frame batches of shape (n, H, W, 3) with n <= ``chunk_frames``.
+
+    Images are treated as a single repeated frame. With ``loop`` the video is
+    restarted when it runs out, matching Wav2Lip's behaviour for short footage.
+    """
+    import cv2
+
+    path = Path(path)
+    if path.suffix.lower() in IMAGE_SUFFIXES:
+        frame = cv2.imread(str(path))
+        if frame is None:
+            raise ValueError(f"Could not read image: {path}")
+        batch = np.repeat(frame[None], chunk_frames, axis=0)
+        while True:
+            yield batch
+            if not loop:
+                return
+
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        batch: List[np.ndarray] = []
+        read_any = False
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                if loop and read_any:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            read_any = True
+            batch.append(frame)
+            if len(batch) == chunk_frames:
+                yield np.stack(batch)
+                batch = []
+        if batch:
+            yield np.stack(batch)
+    finally:
+        cap.release()
+
+
+def rewrite_video(
+    input_path: Path,
+    output_path: Path,
+    transform: FrameTransform,
+    chunk_frames: int = 64,
+    audio_path: Optional[Path] = None,
+):
+    """
+    Stream ``input_path`` through ``transform`` in bounded chunks.
+
+    Transformed frames are piped to ffmpeg as raw video and re-encoded at the
+    input's fps, so the whole video is never in memory. The input's audio
+    track is copied unless ``audio_path`` is given, in which case that file
+    is encoded as the soundtrack instead.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(input_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or RENDERING_CONFIG.fps
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    if audio_path is None:
+        audio_args = ["-i", str(input_path), "-map", "0:v", "-map", "1:a?", "-c:a", "copy"]
+    else:
+        audio_args = [
+            "-i", str(audio_path), "-map", "0:v", "-map", "1:a",
+            "-c:a", RENDERING_CONFIG.audio_codec, "-b:a", RENDERING_CONFIG.audio_bitrate,
+        ]
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin", "-y",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps}", "-i", "-",
+        *audio_args,
+        "-c:v", RENDERING_CONFIG.video_codec, "-pix_fmt", "yuv420p",
+        str(output_path),
+    ]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    offset = 0
+    try:
+        for chunk in iter_video_frames(input_path, chunk_frames):
+            proc.stdin.write(np.ascontiguousarray(transform(chunk, offset)).tobytes())
+            offset += len(chunk)
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def write_wav(path: Path, samples: np.ndarray, sample_rate: int):
+    """Write float32 mono samples as 16-bit PCM WAV"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+
+
+def cut_video_segment(
+    video_path: Path,
+    start: float,
+    duration: float,
+    output_path: Path,
+    total: Optional[float] = None,
+) -> Path:
+    """
+    Cut ``duration`` seconds of ``video_path`` starting at ``start`` (wrapping around).
+
+    Images are returned unchanged since every window shares the same source.
+    """
+    if video_path.suffix.lower() in IMAGE_SUFFIXES:
+        return video_path
+
+    total = probe_duration(video_path) if total is None else total
+    start = start % total if total > 0 else 0.0
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin", "-y",
+        "-ss", f"{start:.3f}", "-i", str(video_path),
+        "-t", f"{duration:.3f}",
+        "-an", "-c:v", RENDERING_CONFIG.video_codec,
+        str(output_path),
+    ]
+    subprocess.run(cmd, check=True)
+    return output_path
+
+
+def concat_segments(segments: List[Path], output_path: Path, video_only: bool = False):
+    """Losslessly join rendered segments with ffmpeg's concat demuxer"""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for seg in segments:
+            f.write(f"file '{seg.resolve()}'\n")
+        list_path = Path(f.name)
+    try:
+        cmd = [
+            "ffmpeg", "-v", "error", "-nostdin", "-y",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            *(["-an"] if video_only else []),
+            "-c", "copy", str(output_path),
+        ]
+        subprocess.run(cmd, check=True)
+    finally:
+        list_path.unlink(missing_ok=True)
+
+
+def mux_audio(video_path: Path, audio_path: Path, output_path: Path):
+    """Copy the video stream and encode ``audio_path`` as its soundtrack"""
+    cmd = [
+        "ffmpeg", "-v", "error", "-nostdin", "-y",
+        "-i", str(video_path), "-i", str(audio_path),
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", RENDERING_CONFIG.audio_codec, "-b:a", RENDERING_CONFIG.audio_bitrate,
+        str(output_path),
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def should_stream(audio_path: Path, min_duration: Optional[float] = None) -> bool:
+    """Whether ``audio_path`` is long enough to warrant windowed processing"""
+    min_duration = AUDIO_CONFIG.stream_min_duration if min_duration is None else min_duration
+    try:
+        return probe_duration(audio_path) > min_duration
+    except (subprocess.CalledProcessError, ValueError, FileNotFoundError):
+        return False
+
+
+def process_in_windows(
+    video_path: Path,
+    audio_path: Path,
+    output_path: Path,
+    render_window: WindowRenderer,
+    window_seconds: Optional[float] = None,
+    cut_video: bool = True,
+) -> bool:
+    """
+    Render a long input window by window and stitch the result.
+
+    Each audio window is written to a temporary WAV alongside the matching
+    slice of the source video, handed to ``render_window``, and the rendered
+    segments are concatenated into ``output_path``, cross-fading at the
+    stitch points. Only one window of audio is held in memory at a time.
+
+    With ``cut_video=False`` the video is not sliced: ``render_window`` gets
+    the full source plus the window's ``start_time=`` and ``duration=`` in
+    seconds, for renderers that read the frames themselves (e.g. Wav2LipRunner,
+    which decodes just that window against its cached face boxes).
+
+    Segment soundtracks are discarded: the joined video is muxed once with
+    the original ``audio_path`` so per-segment encoder padding and frame
+    rounding cannot accumulate into A/V drift.
+    """
+    video_path, audio_path, output_path = Path(video_path), Path(audio_path), Path(output_path)
+    is_image = video_path.suffix.lower() in IMAGE_SUFFIXES
+    video_duration = None if is_image or not cut_video else probe_duration(video_path)
+
+    with tempfile.TemporaryDirectory(prefix="stream_") as tmp:
+        tmp_dir = Path(tmp)
+        segments: List[Path] = []
+
+        for window in iter_audio_windows(audio_path, window_seconds):
+            seg_audio = tmp_dir / f"audio_{window.index:05d}.wav"
+            seg_video = tmp_dir / f"video_{window.index:05d}.mp4"
+            seg_out = tmp_dir / f"out_{window.index:05d}.mp4"
+
+            write_wav(seg_audio, window.samples, window.sample_rate)
+            if cut_video:
+                seg_video = cut_video_segment(
+                    video_path, window.start_time, window.duration, seg_video, video_duration
+                )
+                rendered = render_window(seg_video, seg_audio, seg_out)
+            else:
+                seg_video = video_path
+                rendered = render_window(
+                    video_path, seg_audio, seg_out, start_time=window.start_time, duration=window.duration
+                )
+
+            if not rendered or not seg_out.exists():
+                return False
+            segments.append(seg_out)
+
+            # Inputs are no longer needed once the window is rendered
+            seg_audio.unlink(missing_ok=True)
+            if seg_video != video_path:
+                seg_video.unlink(missing_ok=True)
+
+        if not segments:
+            return False
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        joined = tmp_dir / "joined.mp4"
+        concat_segments(segments, joined, video_only=True)
+        if len(segments) == 1 or RENDERING_CONFIG.crossfade_frames <= 0:
+            mux_audio(joined, audio_path, output_path)
+        else:
+            from src.postprocess.blending import count_frames, crossfade_video
+
+            # Fade across the stitch points to hide pops between windows
+            boundaries = np.cumsum([count_frames(seg) for seg in segments])[:-1].tolist()
+            crossfade_video(joined, output_path, boundaries, audio_path=audio_path)
+
+    return output_path.exists()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Live WebSocket streaming server for avatar speech
+
+Clients push speech incrementally and receive JPEG frames as soon as each
+audio window has been rendered, paced at ``RenderingConfig.fps`` through a
+jitter buffer. Frames are lip-synced by the resident Wav2Lip model when its
+checkpoint is installed; otherwise the source footage is replayed as-is.
+
+Protocol (``/ws/speak``):
+    client -> server
+        binary: 8-byte big-endian float64 send time (time.time()) followed by
+                s16le mono PCM at ``AudioConfig.sample_rate``
+        text:   {"type": "text", "text": "...", "t_in": <send time>}
+                {"type": "end"}  -- flush remaining audio and close the stream
+    server -> client
+        binary: 4-byte big-endian header length, JSON header
+                {"index", "pts", "t_in", "dropped"}, then the JPEG payload
+        text:   {"type": "end", "frames": n, "dropped": n} once drained
+
+Usage:
+    python -m src.streaming.server --source data/raw/training_video.mp4
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import AUDIO_CONFIG, INTERFACE_CONFIG, RENDERING_CONFIG
+from src.streaming.ingest import frames_per_window, iter_audio_chunks, iter_video_frames
+
+DROP_POLICIES = ("drop_late", "none")
+
+
+@dataclass
+class StreamFrame:
+    """An encoded frame waiting in the jitter buffer"""
+    index: int
+    pts: float  # Presentation time in seconds from stream start
+    t_in: float  # Client send time of the audio that produced this frame
+    payload: bytes
+
+
+class SourceFrameRenderer:
+    """
+    Fallback live renderer: replays the avatar's source footage unchanged.
+
+    Renderers implement ``render``, which receives one audio window and must
+    return ``num_frames`` BGR frames. This one ignores the audio and is only
+    used when no Wav2Lip checkpoint is available.
+    """
+
+    def __init__(self, source_path: Path):
+        self.source_path = Path(source_path)
+        self._frames: Iterator[np.ndarray] = iter_video_frames(self.source_path, 1, loop=True)
+
+    def render(self, samples: np.ndarray, start_frame: int, num_frames: int) -> np.ndarray:
+        return np.concatenate([next(self._frames) for _ in range(num_frames)])
+
+
+class Wav2LipFrameRenderer:
+    """
+    Live renderer backed by the resident Wav2LipRunner.
+
+    Each frame needs 16 mel steps (0.2 s) of audio. The renderer keeps a
+    short history of past samples so windows are computed with left context,
+    and frames near the end of a window use the latest mel steps available
+    rather than waiting for future audio.
+    """
+
+    CONTEXT_SECONDS = 0.4
+
+    def __init__(self, runner, avatar, fps: Optional[int] = None, sample_rate: Optional[int] = None):
+        self.runner = runner
+        self.avatar = avatar
+        self.fps = fps or RENDERING_CONFIG.fps
+        self.sample_rate = sample_rate or AUDIO_CONFIG.sample_rate
+        if self.sample_rate != 16000:
+            raise ValueError(f"Wav2Lip needs 16 kHz audio, got {self.sample_rate}")
+        self._history = np.zeros(int(self.CONTEXT_SECONDS * self.sample_rate), dtype=np.float32)
+        self._samples_seen = 0
+
+    def render(self, samples: np.ndarray, start_frame: int, num_frames: int) -> np.ndarray:
+        from src.lipsync.wav2lip import MEL_FPS, MEL_STEP_SIZE
+        import audio
+
+        buf = np.concatenate([self._history, samples])
+        buf_start = self._samples_seen - len(self._history)  # Global sample index of buf[0]
+        mel = audio.melspectrogram(buf)
+
+        offset = int(round(buf_start * MEL_FPS / self.sample_rate))
+        last = mel.shape[1] - MEL_STEP_SIZE
+        mels = []
+        for f in range(start_frame, start_frame + num_frames):
+            pos = min(max(int(f * MEL_FPS / self.fps) - offset, 0), last)
+            mels.append(mel[:, pos:pos + MEL_STEP_SIZE])
+
+        preds = self.runner.infer_mels(self.avatar, mels, start_frame)
+        self._history = buf[-len(self._history):]
+        self._samples_seen += len(samples)
+        return self.runner.composite(self.avatar, preds, start_frame)
+
+
+def default_renderer_factory(source_path: Path) -> Callable[[], object]:
+    """
+    Wav2Lip-backed renderers when the checkpoint exists, else source replay.
+
+    The model and the avatar's face cache are loaded once and shared by
+    every connection; each connection gets its own audio history.
+    """
+    from src.config import EXTERNAL_DIR
+
+    checkpoint = EXTERNAL_DIR / "Wav2Lip" / "checkpoints" / "wav2lip_gan.pth"
+    if not checkpoint.exists():
+        print(f"⚠️  Wav2Lip checkpoint not found at {checkpoint}; replaying source footage without lip-sync")
+        return lambda: SourceFrameRenderer(source_path)
+
+    from src.lipsync.wav2lip import Wav2LipRunner
+
+    print("🧠 Loading Wav2Lip model and avatar...")
+    runner = Wav2LipRunner(checkpoint)
+    avatar = runner.load_avatar(source_path)
+    return lambda: Wav2LipFrameRenderer(runner, avatar)
+
+
+class JitterBuffer:
+    """
+    Bounded frame queue between the renderer and the paced sender.
+
+    Playback starts once ``prebuffer`` frames are queued (or the stream ends)
+    to absorb render jitter. ``put`` waits for space when ``max_frames`` are
+    queued, so audio arriving faster than real time (TTS, bulk uploads)
+    applies backpressure instead of being discarded.
+
+    Frames are scheduled on a playout clock anchored at the first frame (and
+    re-anchored after an underrun). With the ``drop_late`` policy a frame
+    that is already more than one frame interval behind that clock is
+    skipped when a newer one is queued; ``none`` plays every frame at the
+    cost of growing delay.
+    """
+
+    def __init__(
+        self,
+        prebuffer: Optional[int] = None,
+        max_frames: Optional[int] = None,
+        policy: Optional[str] = None,
+        fps: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.prebuffer = RENDERING_CONFIG.stream_jitter_buffer_frames if prebuffer is None else prebuffer
+        self.max_frames = RENDERING_CONFIG.stream_max_buffer_frames if max_frames is None else max_frames
+        self.policy = policy or RENDERING_CONFIG.stream_drop_policy
+        if self.policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {self.policy} (expected one of {DROP_POLICIES})")
+        if not 0 < self.prebuffer <= self.max_frames:
+            raise ValueError(f"prebuffer must be in 1..max_frames, got {self.prebuffer}")
+        self.interval = 1.0 / (fps or RENDERING_CONFIG.fps)
+        self.clock = clock
+
+        self.dropped = 0
+        self.closed = False
+        self._started = False
+        self._origin: Optional[float] = None  # Clock time at which pts 0 is due
+        self._frames: Deque[StreamFrame] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    async def put(self, frame: StreamFrame) -> bool:
+        """
+        Queue a frame, waiting while the buffer is full.
+
+        Returns False without queueing once the buffer is closed, e.g. because
+        the sender stopped when the client disconnected.
+        """
+        while len(self._frames) >= self.max_frames and not self.closed:
+            self._space.clear()
+            await self._space.wait()
+        if self.closed:
+            return False
+        self._frames.append(frame)
+        if len(self._frames) >= self.prebuffer:
+            self._ready.set()
+        return True
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+        self._space.set()
+
+    async def pop(self) -> Optional[Tuple[StreamFrame, float]]:
+        """
+        Wait for the next playable frame.
+
+        Returns (frame, due) where ``due`` is its playout time on ``clock``,
+        or None once closed and drained.
+        """
+        if not self._started:
+            await self._ready.wait()
+            self._started = True
+        while True:
+            while not self._frames:
+                if self.closed:
+                    return None
+                # Underrun: wait for the buffer to refill, then restart the playout clock
+                self._origin = None
+                self._ready.clear()
+                await self._ready.wait()
+
+            frame = self._frames.popleft()
+            self._space.set()
+            now = self.clock()
+            if self._origin is None:
+                self._origin = now - frame.pts
+            due = self._origin + frame.pts
+            if self.policy == "drop_late" and now - due > self.interval and self._frames:
+                self.dropped += 1
+                continue
+            return frame, due
+
+
+class LiveSession:
+    """
+    Accumulates incoming PCM and cuts it into frame-aligned windows.
+
+    Each window carries the send time of its first sample, so latency is
+    measured from when the earliest audio in the window left the client.
+    """
+
+    def __init__(
+        self,
+        fps: Optional[int] = None,
+        sample_rate: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+    ):
+        self.fps = fps or RENDERING_CONFIG.fps
+        self.sample_rate = sample_rate or AUDIO_CONFIG.sample_rate
+        window_seconds = window_seconds or AUDIO_CONFIG.stream_live_window_seconds
+
+        self.window_frames = frames_per_window(window_seconds, self.fps, self.sample_rate)
+        self.window_bytes = self.window_frames * self.sample_rate // self.fps * 2
+        self.next_frame = 0
+        self._pcm = bytearray()
+        # (byte offset into _pcm, send time) for each packet still buffered
+        self._marks: Deque[Tuple[int, float]] = deque()
+
+    def feed(self, pcm: bytes, t_in: float) -> List[Tuple[np.ndarray, int, int, float]]:
+        """Append PCM and return every complete window as (samples, start_frame, num_frames, t_in)"""
+        if pcm:
+            self._marks.append((len(self._pcm), t_in))
+            self._pcm.extend(pcm)
+        windows = []
+        while len(self._pcm) >= self.window_bytes:
+            windows.append(self._cut(self.window_bytes, self.window_frames))
+        return windows
+
+    def flush(self) -> List[Tuple[np.ndarray, int, int, float]]:
+        """Emit the trailing partial window, if any"""
+        usable = len(self._pcm) - len(self._pcm) % 2
+        if not usable:
+            return []
+        num_frames = -(-(usable // 2) * self.fps // self.sample_rate)
+        window = self._cut(usable, num_frames)
+        self._pcm.clear()
+        self._marks.clear()
+        return [window]
+
+    def _cut(self, size: int, num_frames: int) -> Tuple[np.ndarray, int, int, float]:
+        chunk = bytes(self._pcm[:size])
+        del self._pcm[:size]
+        t_first = self._marks[0][1]
+
+        # Shift packet marks and keep the one covering the new first byte
+        marks = deque((pos - size, t) for pos, t in self._marks)
+        while len(marks) > 1 and marks[1][0] <= 0:
+            marks.popleft()
+        if marks and self._pcm:
+            marks[0] = (0, marks[0][1])
+        else:
+            marks.clear()
+        self._marks = marks
+
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+        start = self.next_frame
+        self.next_frame += num_frames
+        return samples, start, num_frames, t_first
+
+
+def synthesize_pcm(text: str, voice: Optional[str] = None, sample_rate: Optional[int] = None) -> bytes:
+    """Run edge-tts and return s16le mono PCM at the configured sample rate"""
+    voice = voice or AUDIO_CONFIG.tts_voice
+    sample_rate = sample_rate or AUDIO_CONFIG.sample_rate
+    with tempfile.TemporaryDirectory() as tmp:
+        media = Path(tmp) / "speech.mp3"
+        cmd = ["edge-tts", "--text", text, "--voice", voice, "--write-media", str(media)]
+        subprocess.run(cmd, capture_output=True, check=True)
+        chunks = iter_audio_chunks(media, sample_rate, sample_rate)
+        return b"".join((np.clip(c, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes() for c in chunks)
+
+
+def encode_frame(frame: np.ndarray, index: int, pts: float, t_in: float, dropped: int) -> bytes:
+    """Pack a BGR frame as header-length + JSON header + JPEG"""
+    import cv2
+
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, RENDERING_CONFIG.stream_jpeg_quality])
+    if not ok:
+        raise RuntimeError(f"Failed to encode frame {index}")
+    header = json.dumps({"index": index, "pts": pts, "t_in": t_in, "dropped": dropped}).encode()
+    return struct.pack(">I", len(header)) + header + jpeg.tobytes()
+
+
+def decode_frame(message: bytes) -> Tuple[dict, bytes]:
+    """Inverse of encode_frame: returns (header, jpeg bytes)"""
+    (size,) = struct.unpack(">I", message[:4])
+    header = json.loads(message[4:4 + size])
+    return header, message[4 + size:]
+
+
+def create_app(source_path: Path, renderer_factory: Optional[Callable[[], object]] = None):
+    """
+    Build the FastAPI app serving ``/ws/speak`` for one avatar source.
+
+    ``renderer_factory`` creates one renderer per connection; by default it
+    comes from ``default_renderer_factory``.
+    """
+    from fastapi import FastAPI, WebSocket
+
+    renderer_factory = renderer_factory or default_renderer_factory(Path(source_path))
+
+    app = FastAPI(title="TalkingAvatar-3DGS Live")
+    fps = RENDERING_CONFIG.fps
+
+    async def render_windows(windows, buffer, renderer) -> bool:
+        """Render and queue windows; False once the buffer has been closed"""
+        for samples, start, num_frames, t_in in windows:
+            if buffer.closed:
+                return False
+            frames = await asyncio.to_thread(renderer.render, samples, start, num_frames)
+            for offset, frame in enumerate(frames[:num_frames]):
+                index = start + offset
+                payload = await asyncio.to_thread(
+                    encode_frame, frame, index, index / fps, t_in, buffer.dropped
+                )
+                if not await buffer.put(StreamFrame(index, index / fps, t_in, payload)):
+                    return False
+        return True
+
+    async def send_frames(websocket, buffer):
+        sent = 0
+        while True:
+            item = await buffer.pop()
+            if item is None:
+                break
+            frame, due = item
+            await asyncio.sleep(max(0.0, due - buffer.clock()))
+            await websocket.send_bytes(frame.payload)
+            sent += 1
+        await websocket.send_text(json.dumps({"type": "end", "frames": sent, "dropped": buffer.dropped}))
+
+    @app.websocket("/ws/speak")
+    async def speak(websocket: WebSocket):
+        await websocket.accept()
+        session = LiveSession()
+        buffer = JitterBuffer()
+        # Each connection gets its own renderer so playback/audio state is not shared
+        window_renderer = renderer_factory()
+        sender = asyncio.create_task(send_frames(websocket, buffer))
+        # If sending fails (client gone), closing the buffer releases a blocked put
+        sender.add_done_callback(lambda _: buffer.close())
+
+        try:
+            while not buffer.closed:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("bytes") is not None:
+                    data = message["bytes"]
+                    (t_in,) = struct.unpack(">d", data[:8])
+                    windows = session.feed(data[8:], t_in)
+                else:
+                    request = json.loads(message["text"])
+                    if request.get("type") == "end":
+                        await render_windows(session.flush(), buffer, window_renderer)
+                        break
+                    if request.get("type") != "text":
+                        continue
+                    pcm = await asyncio.to_thread(synthesize_pcm, request["text"], request.get("voice"))
+                    windows = session.feed(pcm, request.get("t_in", 0.0))
+
+                if not await render_windows(windows, buffer, window_renderer):
+                    break
+        finally:
+            buffer.close()
+            try:
+                await sender
+            except Exception:
+                # Client went away mid-stream
+                pass
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live avatar streaming server")
+    parser.add_argument("--source", type=Path, required=True, help="Avatar source video or image")
+    parser.add_argument("--host", type=str, default=INTERFACE_CONFIG.host)
+    parser.add_argument("--port", type=int, default=INTERFACE_CONFIG.stream_port)
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        print(f"❌ Source not found: {args.source}")
+        return 1
+
+    import uvicorn
+
+    print(f"📡 Streaming avatar from {args.source} on ws://{args.host}:{args.port}/ws/speak")
+    uvicorn.run(create_app(args.source), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
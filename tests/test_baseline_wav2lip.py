@@ -0,0 +1,34 @@
+"""Tests for the baseline Wav2Lip CLI's error reporting"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import baseline_wav2lip
+from baseline_wav2lip import Wav2LipError, run_wav2lip
+
+
+class FaceMissingRunner:
+    def load_avatar(self, *args):
+        raise ValueError("Face not detected! Ensure the video contains a face in all frames.")
+
+
+def test_run_wav2lip_raises_with_the_reason(tmp_path, monkeypatch):
+    checkpoint = tmp_path / "Wav2Lip" / "checkpoints" / "wav2lip_gan.pth"
+    checkpoint.parent.mkdir(parents=True)
+    checkpoint.touch()
+    monkeypatch.setattr(baseline_wav2lip, "EXTERNAL_DIR", tmp_path)
+    monkeypatch.setattr(baseline_wav2lip, "get_runner", lambda path: FaceMissingRunner())
+
+    with pytest.raises(Wav2LipError, match="Face not detected"):
+        run_wav2lip(tmp_path / "face.mp4", tmp_path / "speech.wav", tmp_path / "out.mp4")
+
+
+def test_run_wav2lip_reports_missing_install(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline_wav2lip, "EXTERNAL_DIR", tmp_path)
+
+    with pytest.raises(Wav2LipError, match="setup_runpod.sh"):
+        run_wav2lip(tmp_path / "face.mp4", tmp_path / "speech.wav", tmp_path / "out.mp4")
@@ -0,0 +1,106 @@
+"""Tests for the batch renderer's manifest and results handling"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from batch_wav2lip import load_completed, load_manifest, repair_results
+from src.config import AUDIO_CONFIG
+
+
+def test_load_manifest_jsonl_defaults(tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(
+        json.dumps({"text": "hello"}) + "\n"
+        + "\n"
+        + json.dumps({"id": "b", "audio": "b.wav", "voice": "en-GB-SoniaNeural", "output": "x/b.mp4"}) + "\n"
+    )
+
+    first, second = load_manifest(manifest, tmp_path / "out")
+
+    assert first == {
+        "id": "1",
+        "text": "hello",
+        "audio": None,
+        "voice": AUDIO_CONFIG.tts_voice,
+        "output": tmp_path / "out" / "1.mp4",
+    }
+    assert second["id"] == "b"
+    assert second["text"] is None
+    assert second["audio"] == Path("b.wav")
+    assert second["voice"] == "en-GB-SoniaNeural"
+    assert second["output"] == Path("x/b.mp4")
+
+
+def test_load_manifest_csv(tmp_path):
+    manifest = tmp_path / "jobs.csv"
+    manifest.write_text("id,text,audio\nintro,Hi there,\noutro,,outro.wav\n")
+
+    jobs = load_manifest(manifest, tmp_path)
+
+    assert [job["id"] for job in jobs] == ["intro", "outro"]
+    assert jobs[0]["text"] == "Hi there" and jobs[0]["audio"] is None
+    assert jobs[1]["text"] is None and jobs[1]["audio"] == Path("outro.wav")
+
+
+@pytest.mark.parametrize("rows, message", [
+    ([{"id": "a", "text": "x"}, {"id": "a", "text": "y"}], "Duplicate"),
+    ([{"id": "a"}], "needs either"),
+])
+def test_load_manifest_rejects_bad_jobs(tmp_path, rows, message):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+    with pytest.raises(ValueError, match=message):
+        load_manifest(manifest, tmp_path)
+
+
+def test_load_completed_skips_failed_missing_and_torn_lines(tmp_path):
+    (tmp_path / "a.mp4").touch()
+    (tmp_path / "c.mp4").touch()
+    results = tmp_path / "results.jsonl"
+    results.write_text(
+        json.dumps({"id": "a", "status": "ok", "output": str(tmp_path / "a.mp4")}) + "\n"
+        + json.dumps({"id": "b", "status": "ok", "output": str(tmp_path / "missing.mp4")}) + "\n"
+        + json.dumps({"id": "c", "status": "failed", "output": str(tmp_path / "c.mp4")}) + "\n"
+        + '{"id": "d", "sta'
+    )
+
+    assert load_completed(results) == {"a"}
+    assert load_completed(tmp_path / "absent.jsonl") == set()
+
+
+def test_repair_results_truncates_torn_line(tmp_path):
+    results = tmp_path / "results.jsonl"
+    good = json.dumps({"id": "a", "status": "ok", "output": "a.mp4"}) + "\n"
+    results.write_text(good + '{"id": "b", "sta')
+
+    repair_results(results)
+
+    assert results.read_text() == good
+
+
+def test_repair_results_terminates_complete_last_record(tmp_path):
+    results = tmp_path / "results.jsonl"
+    record = json.dumps({"id": "a", "status": "ok", "output": "a.mp4"})
+    results.write_text(record)
+
+    repair_results(results)
+
+    assert results.read_text() == record + "\n"
+
+
+def test_repair_results_leaves_clean_file_alone(tmp_path):
+    results = tmp_path / "results.jsonl"
+    content = json.dumps({"id": "a"}) + "\n"
+    results.write_text(content)
+
+    repair_results(results)
+    repair_results(tmp_path / "absent.jsonl")
+
+    assert results.read_text() == content
+    assert not (tmp_path / "absent.jsonl").exists()
@@ -0,0 +1,93 @@
+"""Tests for the vectorized box smoothing, blending and cross-fades"""
+
+import numpy as np
+import pytest
+
+from src.postprocess.blending import blend_aligned_crops, blend_crops, crossfade_boundaries, smooth_boxes
+
+
+def reference_smooth(boxes, window):
+    """Wav2Lip's get_smoothened_boxes loop (in place on an integer array)"""
+    boxes = boxes.copy()
+    for i in range(len(boxes)):
+        if i + window > len(boxes):
+            chunk = boxes[len(boxes) - window:]
+        else:
+            chunk = boxes[i:i + window]
+        boxes[i] = np.mean(chunk, axis=0)
+    return boxes
+
+
+@pytest.mark.parametrize("n, window", [(1, 5), (4, 5), (5, 5), (37, 5), (37, 1), (20, 7)])
+def test_smooth_boxes_matches_reference_loop(n, window):
+    rng = np.random.default_rng(n * 10 + window)
+    boxes = rng.integers(0, 500, size=(n, 4))
+
+    expected = reference_smooth(boxes, min(window, n))
+    np.testing.assert_array_equal(smooth_boxes(boxes, window), expected)
+
+
+def test_crossfade_chunked_matches_whole_array():
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, size=(40, 6, 8, 3), dtype=np.uint8)
+    boundaries = [7, 16, 17, 33]  # 16/17 overlap, 33 straddles a chunk edge
+
+    whole = crossfade_boundaries(frames, boundaries, fade_frames=3)
+
+    anchors = {}
+    chunks = [
+        crossfade_boundaries(frames[start:start + 9], boundaries, 3, offset=start, anchors=anchors)
+        for start in range(0, len(frames), 9)
+    ]
+    np.testing.assert_array_equal(np.concatenate(chunks), whole)
+
+
+def test_crossfade_fades_in_from_previous_frame():
+    frames = np.zeros((6, 1, 1, 3), dtype=np.uint8)
+    frames[3:] = 200
+
+    out = crossfade_boundaries(frames, [3], fade_frames=3)
+
+    # Frame 2 (value 0) is held and faded out over frames 3-5
+    assert out[:, 0, 0, 0].tolist() == [0, 0, 0, 50, 100, 150]
+    assert crossfade_boundaries(frames, [3], fade_frames=0).tolist() == frames.tolist()
+
+
+def test_blend_crops_hard_paste_matches_resize():
+    cv2 = pytest.importorskip("cv2")
+    rng = np.random.default_rng(1)
+    frames = rng.integers(0, 256, size=(2, 40, 50, 3), dtype=np.uint8)
+    crops = rng.integers(0, 256, size=(2, 8, 8, 3), dtype=np.uint8)
+    boxes = np.array([[4, 6, 20, 22], [10, 10, 26, 26]])
+
+    out = blend_crops(frames, crops, boxes, feather=0.0, device="cpu")
+
+    for frame, result, crop, (x1, y1, x2, y2) in zip(frames, out, crops, boxes):
+        expected = frame.copy()
+        expected[y1:y2, x1:x2] = cv2.resize(crop, (x2 - x1, y2 - y1))
+        # cv2 uses fixed-point interpolation, so allow off-by-one rounding
+        np.testing.assert_allclose(result.astype(int), expected.astype(int), atol=1)
+
+
+def test_blend_aligned_crops_pastes_through_inverse_affine():
+    cv2 = pytest.importorskip("cv2")
+    rng = np.random.default_rng(2)
+    frames = rng.integers(0, 256, size=(2, 60, 70, 3), dtype=np.uint8)
+    crops = rng.integers(0, 256, size=(2, 32, 32, 3), dtype=np.uint8)
+    rotated = cv2.getRotationMatrix2D((30, 25), 20, 1.5)
+    rotated[:, 2] += [16 - 30, 16 - 25]  # Frame point (30, 25) lands on the crop centre
+    affines = np.stack([rotated, [[2.0, 0, -20], [0, 2.0, -30]]])
+
+    out = blend_aligned_crops(frames, crops, affines, feather=0.0, device="cpu")
+
+    for frame, result, crop, affine in zip(frames, out, crops, affines):
+        inverse = cv2.invertAffineTransform(affine)
+        pasted = cv2.warpAffine(crop, inverse, (70, 60), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        coverage = cv2.warpAffine(np.ones((32, 32), np.uint8), inverse, (70, 60), flags=cv2.INTER_NEAREST)
+
+        # Compare away from the footprint's edge, where sampling conventions differ
+        interior = cv2.erode(coverage, np.ones((3, 3), np.uint8)).astype(bool)
+        outside = ~cv2.dilate(coverage, np.ones((3, 3), np.uint8)).astype(bool)
+        assert interior.sum() > 100
+        np.testing.assert_allclose(result[interior].astype(int), pasted[interior].astype(int), atol=2)
+        np.testing.assert_array_equal(result[outside], frame[outside])
@@ -0,0 +1,130 @@
+"""Tests for the selective GFPGAN enhancement scheduler"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from src.postprocess.enhancement import FACE_SIZE, EnhancementScheduler
+
+SIZE = 64  # Frame side; the stub alignment maps the whole frame onto the 512 crop
+
+
+class StubEnhancer:
+    """Fixed alignment, and 'restoration' that brightens the crop"""
+
+    def __init__(self, affines=None, face=True):
+        scale = FACE_SIZE / SIZE
+        self.affines = list(affines or [])
+        self.default = np.array([[scale, 0, 0], [0, scale, 0]])
+        self.face = face
+        self.detections = 0
+        self.batches = []
+
+    def detect(self, frame):
+        self.detections += 1
+        return np.zeros((5, 2), dtype=np.float32) if self.face else None
+
+    def align(self, landmarks):
+        return self.affines.pop(0) if self.affines else self.default
+
+    def enhance(self, crops):
+        self.batches.append(len(crops))
+        return np.clip(crops.astype(np.int16) + 20, 0, 255).astype(np.uint8)
+
+
+def make_frames(n, moving=()):
+    frames = np.full((n, SIZE, SIZE, 3), 100, dtype=np.uint8)
+    for i in moving:
+        frames[i, SIZE * 3 // 4:, SIZE // 3:SIZE * 2 // 3] = 200  # Open the mouth
+    return frames
+
+
+def run(scheduler, frames, chunk=None):
+    chunk = chunk or len(frames)
+    return np.concatenate([
+        scheduler.process(frames[start:start + chunk], start)
+        for start in range(0, len(frames), chunk)
+    ])
+
+
+def test_static_face_is_enhanced_once_and_propagated():
+    enhancer = StubEnhancer()
+    scheduler = EnhancementScheduler(enhancer, mode="keyframes", threshold=4.0, max_interval=100)
+
+    out = run(scheduler, make_frames(8))
+
+    assert scheduler.stats == {"enhanced": 1, "propagated": 7, "skipped": 0}
+    assert enhancer.batches == [1]
+    # Away from the feathered edge, the propagated residual brightens every frame like the keyframe
+    assert np.all(np.abs(out[:, 12:-12, 12:-12].astype(int) - 120) <= 1)
+
+
+def test_mouth_change_triggers_keyframes():
+    enhancer = StubEnhancer()
+    scheduler = EnhancementScheduler(enhancer, mode="keyframes", threshold=4.0, max_interval=100)
+
+    run(scheduler, make_frames(8, moving=[3]))
+
+    # Opening (3) and closing (4) the mouth both differ from the last keyframe
+    assert scheduler.stats["enhanced"] == 3
+    assert enhancer.batches == [3]
+
+
+def test_max_interval_forces_keyframes_and_redetection():
+    enhancer = StubEnhancer()
+    scheduler = EnhancementScheduler(enhancer, mode="keyframes", threshold=1e9, max_interval=4)
+
+    run(scheduler, make_frames(10))
+
+    assert enhancer.detections == 3  # Frames 0, 4 and 8
+    assert scheduler.stats["enhanced"] == 2  # Frames 0 and 5 (four propagated frames in between)
+
+
+@pytest.mark.parametrize("shift, keyframes", [(0, 3), (-8, 4)])
+def test_new_alignment_forces_keyframe(shift, keyframes):
+    scale = FACE_SIZE / SIZE
+    first = np.array([[scale, 0, 0], [0, scale, 0]])
+    second = np.array([[scale, 0, shift], [0, scale, 0]])
+    enhancer = StubEnhancer(affines=[first, second])
+    scheduler = EnhancementScheduler(enhancer, mode="keyframes", threshold=4.0, max_interval=3)
+
+    # Mouth keyframes at 0, 1 and 2 keep the interval from forcing one at the frame-3 re-detection
+    run(scheduler, make_frames(5, moving=[1]))
+
+    assert scheduler.stats["enhanced"] == keyframes
+
+
+def test_chunked_processing_matches_single_pass():
+    frames = make_frames(12, moving=[5, 6])
+    whole = run(EnhancementScheduler(StubEnhancer(), mode="keyframes", threshold=4.0, max_interval=4), frames)
+    chunked = run(EnhancementScheduler(StubEnhancer(), mode="keyframes", threshold=4.0, max_interval=4), frames, 5)
+
+    np.testing.assert_array_equal(chunked, whole)
+
+
+def test_all_mode_enhances_every_frame_in_one_batch():
+    enhancer = StubEnhancer()
+    scheduler = EnhancementScheduler(enhancer, mode="all", max_interval=100)
+
+    run(scheduler, make_frames(6))
+
+    assert scheduler.stats == {"enhanced": 6, "propagated": 0, "skipped": 0}
+    assert enhancer.batches == [6]
+
+
+def test_frames_without_a_face_are_left_alone():
+    enhancer = StubEnhancer(face=False)
+    scheduler = EnhancementScheduler(enhancer, mode="keyframes", max_interval=100)
+    frames = make_frames(4)
+
+    out = scheduler.process(frames)
+
+    np.testing.assert_array_equal(out, frames)
+    assert scheduler.stats == {"enhanced": 0, "propagated": 0, "skipped": 4}
+    assert enhancer.batches == []
+
+
+def test_off_mode_is_a_no_op():
+    frames = make_frames(3)
+    assert EnhancementScheduler(StubEnhancer(), mode="off").process(frames) is frames
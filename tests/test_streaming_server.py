@@ -0,0 +1,258 @@
+"""Tests for the live streaming server's buffering and windowing"""
+
+import asyncio
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from src.streaming.server import JitterBuffer, LiveSession, StreamFrame
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_frame(index, fps=25):
+    return StreamFrame(index, index / fps, 0.0, b"")
+
+
+def test_put_waits_for_space_instead_of_dropping():
+    async def scenario():
+        buffer = JitterBuffer(prebuffer=1, max_frames=2, policy="drop_late", fps=25, clock=FakeClock())
+        await buffer.put(make_frame(0))
+        await buffer.put(make_frame(1))
+
+        blocked = asyncio.create_task(buffer.put(make_frame(2)))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        frame, _ = await buffer.pop()
+        await asyncio.wait_for(blocked, timeout=1)
+        assert frame.index == 0
+        assert len(buffer) == 2
+        assert buffer.dropped == 0
+
+    asyncio.run(scenario())
+
+
+def test_burst_faster_than_realtime_is_not_dropped():
+    async def scenario():
+        clock = FakeClock()
+        buffer = JitterBuffer(prebuffer=5, max_frames=25, policy="drop_late", fps=25, clock=clock)
+
+        async def produce():
+            for i in range(125):
+                await buffer.put(make_frame(i))
+            buffer.close()
+
+        producer = asyncio.create_task(produce())
+        played = []
+        while True:
+            item = await buffer.pop()
+            if item is None:
+                break
+            frame, due = item
+            clock.now = due  # Sender plays each frame exactly on time
+            played.append(frame.index)
+        await producer
+
+        assert played == list(range(125))
+        assert buffer.dropped == 0
+
+    asyncio.run(scenario())
+
+
+def test_late_frames_are_dropped_against_playout_clock():
+    async def scenario():
+        clock = FakeClock()
+        buffer = JitterBuffer(prebuffer=1, max_frames=10, policy="drop_late", fps=25, clock=clock)
+        for i in range(6):
+            await buffer.put(make_frame(i))
+
+        frame, due = await buffer.pop()
+        assert (frame.index, due) == (0, 0.0)
+
+        # Sender stalled: frames 1-3 are more than one interval (0.04 s) late
+        clock.now = 0.19
+        frame, due = await buffer.pop()
+        assert frame.index == 4
+        assert buffer.dropped == 3
+
+        # The newest frame is always played even when late
+        clock.now = 1.0
+        frame, _ = await buffer.pop()
+        assert frame.index == 5
+        assert buffer.dropped == 3
+
+    asyncio.run(scenario())
+
+
+def test_closing_releases_a_blocked_put():
+    async def scenario():
+        buffer = JitterBuffer(prebuffer=1, max_frames=1, policy="drop_late", fps=25, clock=FakeClock())
+        assert await buffer.put(make_frame(0))
+
+        blocked = asyncio.create_task(buffer.put(make_frame(1)))
+        await asyncio.sleep(0)
+        buffer.close()
+
+        assert await asyncio.wait_for(blocked, timeout=1) is False
+        assert await buffer.put(make_frame(2)) is False
+        assert len(buffer) == 1
+
+    asyncio.run(scenario())
+
+
+def test_policy_none_plays_late_frames():
+    async def scenario():
+        clock = FakeClock()
+        buffer = JitterBuffer(prebuffer=1, max_frames=10, policy="none", fps=25, clock=clock)
+        for i in range(4):
+            await buffer.put(make_frame(i))
+        buffer.close()
+
+        clock.now = 1.0
+        indices = []
+        while (item := await buffer.pop()) is not None:
+            indices.append(item[0].index)
+        assert indices == [0, 1, 2, 3]
+        assert buffer.dropped == 0
+
+    asyncio.run(scenario())
+
+
+def test_underrun_reanchors_playout_clock():
+    async def scenario():
+        clock = FakeClock()
+        buffer = JitterBuffer(prebuffer=1, max_frames=10, policy="drop_late", fps=25, clock=clock)
+        await buffer.put(make_frame(0))
+        await buffer.pop()
+
+        # Buffer runs dry; the next frame arrives a second later
+        consumer = asyncio.create_task(buffer.pop())
+        await asyncio.sleep(0)
+        clock.now = 1.0
+        await buffer.put(make_frame(1))
+        frame, due = await asyncio.wait_for(consumer, timeout=1)
+
+        assert frame.index == 1
+        assert due == pytest.approx(1.0)
+        assert buffer.dropped == 0
+
+    asyncio.run(scenario())
+
+
+def test_prebuffer_must_fit_in_buffer():
+    with pytest.raises(ValueError):
+        JitterBuffer(prebuffer=10, max_frames=5)
+
+
+def pcm(samples):
+    return np.zeros(samples, dtype=np.int16).tobytes()
+
+
+def test_live_session_cuts_frame_aligned_windows():
+    session = LiveSession(fps=25, sample_rate=16000, window_seconds=0.2)
+    assert session.window_frames == 5
+
+    windows = session.feed(pcm(4800), t_in=1.0)
+    assert len(windows) == 1
+    samples, start, num_frames, _ = windows[0]
+    assert (len(samples), start, num_frames) == (3200, 0, 5)
+
+    # 1600 leftover samples = 2.5 frames, rounded up on flush
+    (samples, start, num_frames, _), = session.flush()
+    assert (len(samples), start, num_frames) == (1600, 5, 3)
+    assert session.flush() == []
+
+
+def test_live_session_stamps_window_with_first_sample_send_time():
+    session = LiveSession(fps=25, sample_rate=16000, window_seconds=0.2)
+
+    windows = []
+    for i in range(7):
+        windows += session.feed(pcm(1000), t_in=float(i))
+    windows += session.flush()
+
+    # Windows start at samples 0, 3200 and 6400, which arrived in packets 0, 3 and 6
+    assert [w[3] for w in windows] == [0.0, 3.0, 6.0]
+
+
+def test_server_streams_every_frame_of_a_bulk_upload(tmp_path):
+    pytest.importorskip("fastapi")
+    cv2 = pytest.importorskip("cv2")
+    from fastapi.testclient import TestClient
+    from src.streaming.server import SourceFrameRenderer, create_app
+
+    source = tmp_path / "face.png"
+    cv2.imwrite(str(source), np.zeros((32, 32, 3), dtype=np.uint8))
+    client = TestClient(create_app(source, renderer_factory=lambda: SourceFrameRenderer(source)))
+
+    with client.websocket_connect("/ws/speak") as ws:
+        ws.send_bytes(struct.pack(">d", 0.0) + pcm(16000))
+        ws.send_text(json.dumps({"type": "end"}))
+        frames = 0
+        while True:
+            message = ws.receive()
+            if message.get("text"):
+                summary = json.loads(message["text"])
+                break
+            frames += 1
+
+    assert frames == 25
+    assert summary == {"type": "end", "frames": 25, "dropped": 0}
+
+
+class DisconnectingSocket:
+    """WebSocket stand-in whose client vanishes after reading one frame"""
+
+    def __init__(self, packets):
+        self.packets = list(packets)
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        if self.packets:
+            return {"type": "websocket.receive", "bytes": self.packets.pop(0)}
+        await asyncio.sleep(3600)  # A client that stopped talking without closing
+
+    async def send_bytes(self, data):
+        if self.sent >= 1:
+            raise ConnectionError("client disconnected")
+        self.sent += 1
+
+    async def send_text(self, data):
+        raise ConnectionError("client disconnected")
+
+
+def test_handler_exits_when_client_disconnects_mid_stream(tmp_path):
+    pytest.importorskip("fastapi")
+    cv2 = pytest.importorskip("cv2")
+    from src.streaming.server import SourceFrameRenderer, create_app
+
+    source = tmp_path / "face.png"
+    cv2.imwrite(str(source), np.zeros((32, 32, 3), dtype=np.uint8))
+    renders = []
+
+    class CountingRenderer(SourceFrameRenderer):
+        def render(self, samples, start_frame, num_frames):
+            renders.append(start_frame)
+            return super().render(samples, start_frame, num_frames)
+
+    app = create_app(source, renderer_factory=lambda: CountingRenderer(source))
+    speak = next(route.endpoint for route in app.routes if getattr(route, "path", None) == "/ws/speak")
+
+    # 30 s of audio in one packet: far more frames than the buffer holds
+    socket = DisconnectingSocket([struct.pack(">d", 0.0) + pcm(16000 * 30)])
+    asyncio.run(asyncio.wait_for(speak(socket), timeout=5))
+
+    assert socket.sent == 1
+    assert len(renders) <= 10  # Stopped with the buffer full, not after all 150 windows
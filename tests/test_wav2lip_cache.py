@@ -0,0 +1,86 @@
+"""Tests for the Wav2Lip runner's face cache and resident avatars"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from src.config import RENDERING_CONFIG
+from src.lipsync import wav2lip
+from src.postprocess.blending import smooth_boxes
+
+
+def write_video(path, frames=6, size=32):
+    """Video whose frame i is filled with the value 10 * i"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (size, size))
+    for i in range(frames):
+        writer.write(np.full((size, size, 3), 10 * i, dtype=np.uint8))
+    writer.release()
+
+
+def raw_boxes(n):
+    return np.array([[i, i, 20 + i, 20 + 2 * i] for i in range(n)])
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(wav2lip, "FACE_CACHE_DIR", tmp_path / "face_cache")
+    runner = object.__new__(wav2lip.Wav2LipRunner)  # Skip loading the model
+    runner.pads = wav2lip.DEFAULT_PADS
+    runner.face_det_batch_size = 4
+    runner.max_avatars = 1
+    runner._avatars = OrderedDict()
+    runner.detections = 0
+
+    def detect(batches):
+        runner.detections += 1
+        return raw_boxes(sum(len(batch) for batch in batches))
+
+    runner._detect_faces = detect
+    return runner
+
+
+def test_raw_boxes_are_cached_and_smoothed_on_load(tmp_path, monkeypatch, runner):
+    video = tmp_path / "avatar.avi"
+    write_video(video)
+
+    monkeypatch.setattr(RENDERING_CONFIG, "box_smoothing_window", 3)
+    avatar = runner.load_avatar(video)
+    assert runner.detections == 1
+    np.testing.assert_array_equal(np.load(next((tmp_path / "face_cache").glob("*.npy"))), raw_boxes(6))
+    np.testing.assert_array_equal(avatar.boxes, smooth_boxes(raw_boxes(6), 3))
+
+    # A new window reuses the cached detections but smooths them differently
+    monkeypatch.setattr(RENDERING_CONFIG, "box_smoothing_window", 1)
+    avatar = runner.load_avatar(video)
+    assert runner.detections == 1
+    np.testing.assert_array_equal(avatar.boxes, raw_boxes(6))
+
+
+def test_only_the_most_recent_avatar_stays_resident(tmp_path, runner):
+    first, second = tmp_path / "first.avi", tmp_path / "second.avi"
+    write_video(first)
+    write_video(second)
+
+    avatar = runner.load_avatar(first)
+    assert runner.load_avatar(first) is avatar
+    runner.load_avatar(second)
+
+    assert len(runner._avatars) == 1
+    assert runner.load_avatar(first) is not avatar
+    assert runner.detections == 2  # Reloading first hit the disk box cache
+
+
+def test_window_decodes_only_its_frames_and_loops(tmp_path, monkeypatch, runner):
+    monkeypatch.setattr(RENDERING_CONFIG, "box_smoothing_window", 1)
+    video = tmp_path / "avatar.avi"
+    write_video(video)
+
+    # 0.2 s from 0.16 s at 25 fps: frames 4, 5, then wrapping to 0, 1, 2
+    avatar = runner.load_avatar(video, start_time=0.16, duration=0.2)
+
+    assert [int(np.round(frame.mean() / 10)) for frame in avatar.frames] == [4, 5, 0, 1, 2]
+    np.testing.assert_array_equal(avatar.boxes, raw_boxes(6)[[4, 5, 0, 1, 2]])
+    assert not runner._avatars
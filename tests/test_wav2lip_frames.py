@@ -0,0 +1,61 @@
+"""Tests that windowed Wav2Lip rendering keeps one frame per frame of audio"""
+
+import math
+import sys
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from src.lipsync import wav2lip
+from src.streaming import ingest
+
+SAMPLE_RATE = 16000
+FPS = 25
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    """Runner whose mel_chunks sees a stubbed Wav2Lip ``audio`` module"""
+    tracks = {}
+    stub = types.ModuleType("audio")
+    stub.load_wav = lambda path, sr: tracks[path]
+    # Wav2Lip's melspectrogram: 80 bins, hop 200, centred STFT
+    stub.melspectrogram = lambda wav: np.zeros((80, 1 + len(wav) // 200), dtype=np.float32)
+    monkeypatch.setitem(sys.modules, "audio", stub)
+
+    runner = object.__new__(wav2lip.Wav2LipRunner)  # Skip loading the model
+    runner.tracks = tracks
+    return runner
+
+
+def frame_count(runner, samples, fps=FPS):
+    runner.tracks["track.wav"] = np.zeros(samples, dtype=np.float32)
+    chunks = runner.mel_chunks("track.wav", fps)
+    assert all(chunk.shape == (80, wav2lip.MEL_STEP_SIZE) for chunk in chunks)
+    return len(chunks)
+
+
+@pytest.mark.parametrize("samples", [160000, 16000, 1234, 100])
+def test_mel_chunks_cover_every_frame_of_audio(runner, samples):
+    assert frame_count(runner, samples) == math.ceil(samples * FPS / SAMPLE_RATE)
+    assert frame_count(runner, samples, float(FPS)) == math.ceil(samples * FPS / SAMPLE_RATE)
+
+
+@pytest.mark.parametrize("seconds", [61, 3600.5])
+def test_windowed_frame_count_matches_duration(runner, monkeypatch, seconds):
+    total = int(seconds * SAMPLE_RATE)
+
+    def fake_chunks(path, chunk_samples, sample_rate=None):
+        for start in range(0, total, chunk_samples):
+            yield np.zeros(min(chunk_samples, total - start), dtype=np.float32)
+
+    monkeypatch.setattr(ingest, "iter_audio_chunks", fake_chunks)
+
+    windows = list(ingest.iter_audio_windows("long.wav", 10.0, FPS, SAMPLE_RATE))
+    rendered = [frame_count(runner, len(window.samples)) for window in windows]
+
+    assert rendered == [window.num_frames for window in windows]
+    assert sum(rendered) == math.ceil(seconds * FPS)